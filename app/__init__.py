@@ -5,16 +5,44 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
 from config import Config
+from app.sharding import RegionSession, configure_regions, init_region_shards
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RegionSession})
 login_manager = LoginManager()
 
 
-def create_app(config_class=Config):
+def create_app(config_class=Config, web=True):
+    """
+    Build the app. web=False is for maintenance jobs (manage.py): database,
+    models and config only; blueprints, Flask-Login and request hooks are
+    never imported or registered, which keeps cron start-up short.
+    """
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    configure_regions(app)
     db.init_app(app)
+    if web:
+        _init_web(app)
+
+    from app import models  # noqa: F401  (registers every table for create_all)
+    with app.app_context():
+        db.create_all()
+        from app.services.search_service import init_search_index
+        app.extensions['fts5'] = init_search_index(db.engine)
+        init_region_shards(app)
+        if web:
+            from app.migrations import pending_changes
+            if pending_changes():
+                raise RuntimeError('Database schema is out of date; run `python manage.py migrate` first.')
+
+    return app
+
+
+def _init_web(app):
+    """Blueprints, login, request-scoped unit of work and the top-level routes."""
+    from app.unit_of_work import init_unit_of_work
+    init_unit_of_work(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -35,6 +63,11 @@ def create_app(config_class=Config):
     app.register_blueprint(ngo_bp, url_prefix='/ngo')
     app.register_blueprint(admin_bp, url_prefix='/admin')
 
+    from app.services.fragment_cache import render_fragment
+    from app.csrf import csrf_token
+    app.jinja_env.globals['render_fragment'] = render_fragment
+    app.jinja_env.globals['csrf_token'] = csrf_token
+
     @app.route('/')
     def index():
         from flask import redirect, url_for
@@ -48,7 +81,17 @@ def create_app(config_class=Config):
                 return redirect(url_for('admin.dashboard'))
         return redirect(url_for('auth.login'))
 
-    with app.app_context():
-        db.create_all()
+    @app.route('/healthz')
+    def healthz():
+        from flask import jsonify
+        return jsonify({'status': 'ok'})
 
-    return app
+    @app.route('/readyz')
+    def readyz():
+        # 503 until warm_up() has finished; wsgi.py and run.py run it before serving, other entry points may not
+        from flask import jsonify
+        from app.warmup import is_ready
+        state = app.extensions.get('warmup', {})
+        ready = is_ready(app)
+        return jsonify({'ready': ready, 'warmup_ms': state.get('total_ms'), 'steps_ms': state.get('timings_ms'),
+                        'warmup_errors': state.get('errors') or None}), 200 if ready else 503
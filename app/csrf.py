@@ -0,0 +1,33 @@
+"""Per-session CSRF tokens for state-changing form posts."""
+import hmac
+import secrets
+from functools import wraps
+
+from flask import abort, request, session
+
+_SESSION_KEY = '_csrf_token'
+
+
+def csrf_token() -> str:
+    """The session's token, created on first use. Exposed to templates as csrf_token()."""
+    token = session.get(_SESSION_KEY)
+    if token is None:
+        token = session[_SESSION_KEY] = secrets.token_urlsafe(32)
+    return token
+
+
+def csrf_protect(f):
+    """
+    Reject a state-changing request with 400 unless it carries the session's
+    token (form field or X-CSRF-Token header). GET and HEAD pass through.
+    """
+    @wraps(f)
+    def wrapped(*args, **kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return f(*args, **kwargs)
+        expected = session.get(_SESSION_KEY)
+        sent = request.form.get('csrf_token') or request.headers.get('X-CSRF-Token') or ''
+        if not expected or not hmac.compare_digest(sent, expected):
+            abort(400, description='Missing or invalid CSRF token.')
+        return f(*args, **kwargs)
+    return wrapped
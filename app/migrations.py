@@ -0,0 +1,215 @@
+"""
+In-place schema upgrades for databases created by earlier releases.
+
+db.create_all() only creates missing tables. This adds what later releases
+put on existing ones: new columns (with backfills), indexes, SQLite
+AUTOINCREMENT on tables whose ids must never be reused, and moves rows of
+tables that now live in their post's region shard out of the main database.
+Every step checks the live schema first, so running it again is a no-op.
+
+    python manage.py migrate
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.schema import CreateTable
+
+# Columns whose value on existing rows is derived from other columns, run once when the column is added
+_BACKFILLS = {
+    'updated_at': 'UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)',
+}
+
+# Tables that moved from the main database into their post's shard -> the post id column
+_MOVED_TO_SHARDS = {
+    'delivery_track': 'food_id',
+}
+
+
+def _tables_by_engine():
+    """(engine, tables it holds) for the main database and every region shard."""
+    from app import db
+    from app.sharding import SHARDED_TABLES, bind_key, get_router
+
+    yield db.engines[None], list(db.metadata.sorted_tables)
+    sharded = [t for t in db.metadata.sorted_tables if t.name in SHARDED_TABLES]
+    for name in get_router().names[1:]:
+        yield db.engines[bind_key(name)], sharded
+
+
+@contextmanager
+def _transaction(engine):
+    """
+    One real transaction around DDL. The sqlite3 driver commits implicitly
+    before ALTER/CREATE, so the connection runs in autocommit mode and the
+    transaction is opened and closed explicitly; a failed step leaves the
+    database as it was.
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+        conn.exec_driver_sql('BEGIN IMMEDIATE' if engine.dialect.name == 'sqlite' else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.exec_driver_sql('ROLLBACK')
+            raise
+        conn.exec_driver_sql('COMMIT')
+
+
+def _needs_autoincrement(conn, table) -> bool:
+    if conn.dialect.name != 'sqlite' or not table.dialect_options['sqlite'].get('autoincrement'):
+        return False
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                       {'name': table.name}).scalar()
+    return 'AUTOINCREMENT' not in (sql or '').upper()
+
+
+def _missing(conn, table):
+    """(missing columns, missing indexes, needs AUTOINCREMENT) for one existing table."""
+    insp = inspect(conn)
+    columns = {c['name'] for c in insp.get_columns(table.name)}
+    indexes = {i['name'] for i in insp.get_indexes(table.name)}
+    return ([c for c in table.columns if c.name not in columns],
+            [i for i in table.indexes if i.name not in indexes],
+            _needs_autoincrement(conn, table))
+
+
+def _add_column(conn, table, column):
+    preparer = conn.dialect.identifier_preparer
+    ddl = (f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} '
+           f'{column.type.compile(dialect=conn.dialect)}')
+    if not column.nullable:
+        # SQLite only adds NOT NULL columns with a constant default for the existing rows
+        default = column.default.arg if column.default is not None and column.default.is_scalar else None
+        if default is None:
+            raise RuntimeError(f'{table.name}.{column.name} is NOT NULL without a scalar default')
+        ddl += f' NOT NULL DEFAULT {default!r}'
+    conn.execute(text(ddl))
+    if column.name in _BACKFILLS:
+        conn.execute(text(_BACKFILLS[column.name].format(table=preparer.format_table(table))))
+
+
+def _rebuild_with_autoincrement(conn, table):
+    """SQLite cannot ALTER a table to AUTOINCREMENT: copy it into a new table and swap the names."""
+    from app.services.search_service import FTS_TABLE
+
+    preparer = conn.dialect.identifier_preparer
+    scratch = MetaData()  # holds the foreign-key targets the copy refers to
+    for other in table.metadata.sorted_tables:
+        other.to_metadata(scratch)
+    new = table.to_metadata(scratch, name=f'{table.name}__new')
+    cols = ', '.join(preparer.format_column(c) for c in table.columns)
+    conn.execute(CreateTable(new))  # indexes are recreated under their own names after the swap
+    conn.execute(text(f'INSERT INTO {preparer.format_table(new)} ({cols}) '
+                      f'SELECT {cols} FROM {preparer.format_table(table)}'))
+    conn.execute(text(f'DROP TABLE {preparer.format_table(table)}'))  # also drops its FTS sync triggers
+    conn.execute(text(f'ALTER TABLE {preparer.format_table(new)} RENAME TO {preparer.format_table(table)}'))
+    if table.name == 'food_post':
+        conn.execute(text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))  # recreated with its triggers afterwards
+
+
+def _misplaced_rows(conn, table_name: str, column: str):
+    """Rows left in the main database whose post lives in a region shard, as {region: [row, ...]}."""
+    from app.sharding import DEFAULT_REGION, POST_ID_STRIDE, get_router
+
+    router = get_router()
+    if not router.sharded or table_name not in inspect(conn).get_table_names():
+        return {}
+    rows = conn.execute(text(f'SELECT * FROM {table_name} WHERE {column} >= :base'),
+                        {'base': POST_ID_STRIDE}).mappings()
+    by_region = {}
+    for row in rows:
+        region = router.region_for_post_id(row[column])
+        if region != DEFAULT_REGION:
+            by_region.setdefault(region, []).append(dict(row))
+    return by_region
+
+
+def _move_to_shards(table_name: str, column: str):
+    """
+    Copy misplaced rows into their shard, then delete them from main. The
+    shard commits first: if the delete fails the copy is already safe, and the
+    next run skips rows the shard already has before retrying the delete.
+    """
+    from app import db
+    from app.sharding import bind_key
+
+    main = db.engines[None]
+    with main.connect() as conn:
+        by_region = _misplaced_rows(conn, table_name, column)
+    moved = []
+    for region, rows in by_region.items():
+        cols = [c for c in rows[0] if c != 'id']  # the shard assigns ids from its own range
+        with _transaction(db.engines[bind_key(region)]) as conn:
+            for row in rows:
+                conn.execute(text(
+                    f'INSERT INTO {table_name} ({", ".join(cols)}) SELECT {", ".join(":" + c for c in cols)} '
+                    f'WHERE NOT EXISTS (SELECT 1 FROM {table_name} WHERE {column} = :{column})'
+                ), {c: row[c] for c in cols})
+        with _transaction(main) as conn:
+            conn.execute(text(f'DELETE FROM {table_name} WHERE id IN ({", ".join(str(int(r["id"])) for r in rows)})'))
+        moved.append(f'moved {len(rows)} {table_name} rows to region {region}')
+    return moved
+
+
+def pending_changes():
+    """Describe every schema change upgrade_schema() would make; empty when the database is current."""
+    from app import db
+
+    changes = []
+    for engine, tables in _tables_by_engine():
+        with engine.connect() as conn:
+            existing = set(inspect(conn).get_table_names())
+            for table in tables:
+                if table.name not in existing:
+                    continue  # created by create_all()
+                columns, indexes, autoincrement = _missing(conn, table)
+                changes += [f'{engine.url.database}: add column {table.name}.{c.name}' for c in columns]
+                changes += [f'{engine.url.database}: create index {i.name}' for i in indexes]
+                if autoincrement:
+                    changes.append(f'{engine.url.database}: rebuild {table.name} with AUTOINCREMENT')
+    with db.engines[None].connect() as conn:
+        for table_name, column in _MOVED_TO_SHARDS.items():
+            changes += [f'move {len(rows)} {table_name} rows to region {region}'
+                        for region, rows in _misplaced_rows(conn, table_name, column).items()]
+    return changes
+
+
+def upgrade_schema():
+    """
+    Bring every database up to the current models, one transaction per
+    database. Returns the changes made. Call after create_app(), which creates
+    missing tables; rating counters added here are rebuilt in the ORM session,
+    which the caller commits.
+    """
+    from app.services.rating_service import recompute_trust_scores
+    from app.services.search_service import init_search_index
+
+    applied = []
+    added = set()
+    for engine, tables in _tables_by_engine():
+        rebuilt_posts = False
+        with _transaction(engine) as conn:
+            existing = set(inspect(conn).get_table_names())
+            for table in tables:
+                if table.name not in existing:
+                    continue
+                columns, _, autoincrement = _missing(conn, table)
+                for column in columns:
+                    _add_column(conn, table, column)
+                    added.add((table.name, column.name))
+                    applied.append(f'{engine.url.database}: add column {table.name}.{column.name}')
+                if autoincrement:
+                    _rebuild_with_autoincrement(conn, table)
+                    rebuilt_posts = rebuilt_posts or table.name == 'food_post'
+                    applied.append(f'{engine.url.database}: rebuild {table.name} with AUTOINCREMENT')
+                for index in _missing(conn, table)[1]:
+                    index.create(conn)
+                    applied.append(f'{engine.url.database}: create index {index.name}')
+        if rebuilt_posts:
+            init_search_index(engine)
+    for table_name, column in _MOVED_TO_SHARDS.items():
+        applied += _move_to_shards(table_name, column)
+    if ('user', 'rating_count') in added:
+        recompute_trust_scores()
+        applied.append('recomputed rating counters and trust scores')
+    return applied
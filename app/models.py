@@ -1,6 +1,7 @@
 """Database models."""
 from datetime import datetime
 from flask_login import UserMixin
+from sqlalchemy.orm import selectinload
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from app import db, login_manager
@@ -16,8 +17,18 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(32), nullable=False)  # donor, ngo, admin
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    match_radius_km = db.Column(db.Float)  # NGO alert radius; falls back to MATCH_RADIUS_KM
     average_rating = db.Column(db.Float, default=0.0)
+    rating_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    trust_score = db.Column(db.Float, default=0.0)  # Bayesian-smoothed rating, see rating_service
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by every ORM and Core UPDATE; drives the incremental change feed (export_service)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index('ix_user_role_trust_score', 'role', 'trust_score'),
+    )
 
     # Relationship
     food_posts = db.relationship('FoodPost', backref='donor', lazy='dynamic', foreign_keys='FoodPost.donor_id')
@@ -48,11 +59,17 @@ class User(UserMixin, db.Model):
 
 class FoodPost(db.Model):
     __tablename__ = 'food_post'
+    # AUTOINCREMENT keeps ids inside each region shard's id range (see app.sharding)
+    __table_args__ = (
+        db.Index('ix_food_post_status_latitude', 'status', 'latitude'),  # map tile / cluster queries
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     donor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     food_type = db.Column(db.String(256), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)  # number of portions
+    remaining_quantity = db.Column(db.Integer)  # portions not yet claimed; NULL on rows from before claims
     expiry_time = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(32), default='available')  # available, accepted, delivered, expired
     delivery_type = db.Column(db.String(32), default='pickup')  # pickup, delivery
@@ -60,6 +77,7 @@ class FoodPost(db.Model):
     longitude = db.Column(db.Float, nullable=False)
     address = db.Column(db.String(512))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # When NGO accepts - auto-assign
     ngo_id = db.Column(db.Integer, db.ForeignKey('user.id'))
@@ -68,11 +86,39 @@ class FoodPost(db.Model):
     delivered_at = db.Column(db.DateTime)
 
     ratings = db.relationship('Rating', backref='food_post', lazy='dynamic', foreign_keys='Rating.food_id')
+    claims = db.relationship('Claim', backref='food_post', order_by='Claim.id')
+
+    @property
+    def portions_left(self):
+        if self.status != 'available':
+            return 0
+        return self.quantity if self.remaining_quantity is None else self.remaining_quantity
+
+    @property
+    def is_partially_claimed(self):
+        return self.status == 'available' and self.remaining_quantity is not None \
+            and self.remaining_quantity < self.quantity
 
     @property
     def is_expired(self):
         return datetime.utcnow() > self.expiry_time
 
+    @property
+    def display_status(self):
+        """Status to show: an available post past its expiry reads as expired before the expire job marks it."""
+        return 'expired' if self.status == 'available' and self.is_expired else self.status
+
+    @staticmethod
+    def display_status_is(status: str):
+        """SQL condition for posts whose display_status is `status`."""
+        now = datetime.utcnow()
+        if status == 'expired':
+            return db.or_(FoodPost.status == 'expired',
+                          db.and_(FoodPost.status == 'available', FoodPost.expiry_time <= now))
+        if status == 'available':
+            return db.and_(FoodPost.status == 'available', FoodPost.expiry_time > now)
+        return FoodPost.status == status
+
     @property
     def expires_soon(self):
         from datetime import timedelta
@@ -91,6 +137,60 @@ class Rating(db.Model):
     food_id = db.Column(db.Integer, db.ForeignKey('food_post.id'), nullable=False)
     rater_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # who gave the rating
     rated_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # who received the rating
+    claim_id = db.Column(db.Integer, db.ForeignKey('claim.id'))  # set when rating a partial claim
     rating_value = db.Column(db.Integer, nullable=False)  # 1-5
     feedback = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+
+class Claim(db.Model):
+    """A portion of a FoodPost claimed by one NGO, with its own delivery and rating lifecycle."""
+    __tablename__ = 'claim'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    food_id = db.Column(db.Integer, db.ForeignKey('food_post.id'), nullable=False, index=True)
+    ngo_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    portions = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(32), default='accepted')  # accepted, delivered
+    accepted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime)
+
+    ngo = db.relationship('User', foreign_keys=[ngo_id])
+
+    def __repr__(self):
+        return f'<Claim {self.id} post={self.food_id} ngo={self.ngo_id} x{self.portions}>'
+
+
+class DeliveryTrack(db.Model):
+    __tablename__ = 'delivery_track'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    food_id = db.Column(db.Integer, db.ForeignKey('food_post.id'), unique=True, nullable=False)
+    points = db.Column(db.Text)  # JSON list of [lat, lon, unix_ts], downsampled
+    point_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DeletedRow(db.Model):
+    """Tombstone for a row deleted from a change-feed table, written in the same transaction as the delete."""
+    __tablename__ = 'deleted_row'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(32), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # when it was deleted
+
+    def __repr__(self):
+        return f'<DeletedRow {self.table_name} {self.row_id}>'
+
+
+# Loader options for any FoodPost listing that renders donor/NGO details:
+# one extra IN query per relationship instead of one lazy load per row.
+# selectinload (not joinedload) because users and region-sharded posts may
+# live in different databases.
+def listing_loaders():
+    return selectinload(FoodPost.donor), selectinload(FoodPost.ngo)
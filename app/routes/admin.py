@@ -1,12 +1,21 @@
 """Admin routes."""
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, send_file, flash, redirect
+from flask import (
+    Blueprint, render_template, request, send_file, flash, redirect, url_for, jsonify, Response, abort
+)
 from flask_login import login_required, current_user
 import io
 import csv
 
 from app import db
-from app.models import FoodPost, User, Rating
+from app.csrf import csrf_protect
+from app.models import Claim, FoodPost, User, Rating, listing_loaders
+from app.services.cluster_service import get_clusters, parse_bbox
+from app.services.rating_service import top_users
+from app.sharding import fan_out, merge_ordered
+from app.services.search_service import search_posts
+from app.services.export_service import InvalidCursor, collect_changes, gzip_jsonl
+from app.services.import_service import IMPORT_ROLES, import_job_status, pop_import_report, start_import_job
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -26,25 +35,23 @@ def admin_required(f):
 @login_required
 @admin_required
 def dashboard():
-    posts = FoodPost.query.order_by(FoodPost.created_at.desc()).all()
-
-    # Metrics
-    total_quantity = sum(p.quantity for p in posts if p.status == 'delivered')
-    delivered = FoodPost.query.filter_by(status='delivered').count()
-    total_posts = FoodPost.query.count()
+    # Latest posts: each shard returns its newest 20, the merged top 20 is global
+    posts = FoodPost.query.options(*listing_loaders()).order_by(FoodPost.created_at.desc()).limit(20).all()
+    posts = merge_ordered(posts, key=lambda p: p.created_at, reverse=True)[:20]
+
+    # Metrics, aggregated per region shard in parallel
+    shard_stats = fan_out(_post_stats)
+    total_posts = sum(s[0] for s in shard_stats)
+    delivered = sum(s[1] for s in shard_stats)
+    total_quantity = sum(s[2] for s in shard_stats)
     donors = User.query.filter_by(role='donor').count()
     ngos = User.query.filter_by(role='ngo').count()
 
     # Average trust (average of all users with ratings)
-    rated_users = User.query.filter(User.average_rating > 0).all()
-    avg_trust = sum(u.average_rating for u in rated_users) / len(rated_users) if rated_users else 0
+    avg_trust = db.session.query(db.func.avg(User.average_rating)).filter(User.rating_count > 0).scalar() or 0
 
-    # Top donors by delivered posts
-    donor_counts = {}
-    for p in FoodPost.query.filter_by(status='delivered').all():
-        donor_counts[p.donor_id] = donor_counts.get(p.donor_id, 0) + 1
-    top_donor_ids = sorted(donor_counts, key=donor_counts.get, reverse=True)[:5]
-    top_donors = [User.query.get(i) for i in top_donor_ids if User.query.get(i)]
+    top_donors = top_users('donor', 5)
+    top_ngos = top_users('ngo', 5)
 
     return render_template('admin/dashboard.html',
                           posts=posts,
@@ -54,15 +61,60 @@ def dashboard():
                           donors_count=donors,
                           ngos_count=ngos,
                           avg_trust=round(avg_trust, 2),
-                          top_donors=top_donors)
+                          top_donors=top_donors,
+                          top_ngos=top_ngos)
+
+
+def _post_stats():
+    """(total posts, deliveries, delivered portions) for the current shard."""
+    delivered = FoodPost.status == 'delivered'
+    total, delivered_count, quantity = db.session.query(
+        db.func.count(FoodPost.id),
+        db.func.sum(db.case((delivered, 1), else_=0)),
+        db.func.sum(db.case((delivered, FoodPost.quantity), else_=0)),
+    ).one()
+    # Delivered claims on posts that never became 'delivered' (e.g. the unclaimed rest expired)
+    claim_count, claim_portions = db.session.query(
+        db.func.count(Claim.id), db.func.sum(Claim.portions)
+    ).join(FoodPost, Claim.food_id == FoodPost.id).filter(Claim.status == 'delivered', ~delivered).one()
+    return total or 0, (delivered_count or 0) + claim_count, (quantity or 0) + (claim_portions or 0)
+
+
+@admin_bp.route('/api/leaderboard')
+@login_required
+@admin_required
+def leaderboard():
+    role = request.args.get('role', 'donor')
+    if role not in ('donor', 'ngo'):
+        return jsonify({'error': 'role must be donor or ngo'}), 400
+    k = min(max(request.args.get('k', type=int) or 10, 1), 100)
+    return jsonify({
+        'role': role,
+        'leaders': [{
+            'id': u.id,
+            'name': u.name,
+            'trust_score': u.trust_score,
+            'average_rating': u.average_rating,
+            'rating_count': u.rating_count,
+        } for u in top_users(role, k)]
+    })
 
 
 @admin_bp.route('/posts')
 @login_required
 @admin_required
 def posts():
-    posts = FoodPost.query.order_by(FoodPost.created_at.desc()).all()
-    return render_template('admin/posts.html', posts=posts)
+    q = request.args.get('q', '').strip()
+    status = request.args.get('status', '').strip()
+    query = FoodPost.query.options(*listing_loaders())
+    if status:
+        query = query.filter(FoodPost.display_status_is(status))
+    if q:
+        posts = search_posts(query, q, 500)
+    else:
+        posts = query.order_by(FoodPost.created_at.desc()).all()
+        posts = merge_ordered(posts, key=lambda p: p.created_at, reverse=True)
+    return render_template('admin/posts.html', posts=posts, q=q, status=status)
 
 
 @admin_bp.route('/export/csv')
@@ -82,10 +134,11 @@ def export_csv():
     else:
         end = datetime(year, month + 1, 1) - timedelta(seconds=1)
 
-    posts = FoodPost.query.filter(
+    posts = FoodPost.query.options(*listing_loaders()).filter(
         FoodPost.created_at >= start,
         FoodPost.created_at <= end
     ).order_by(FoodPost.created_at).all()
+    posts = merge_ordered(posts, key=lambda p: p.created_at)
 
     output = io.StringIO()
     writer = csv.writer(output)
@@ -95,7 +148,7 @@ def export_csv():
         donor = p.donor
         ngo = p.ngo
         writer.writerow([
-            p.id, donor.name, donor.email, p.food_type, p.quantity, p.status,
+            p.id, donor.name, donor.email, p.food_type, p.quantity, p.display_status,
             ngo.name if ngo else '', ngo.email if ngo else '',
             p.accepted_at.isoformat() if p.accepted_at else '',
             p.delivered_at.isoformat() if p.delivered_at else '',
@@ -111,3 +164,78 @@ def export_csv():
     )
 
 
+@admin_bp.route('/export/changes')
+@login_required
+@admin_required
+def export_changes():
+    """Rows changed since ?since=<cursor> as gzip JSON Lines; the next cursor is in X-Next-Cursor."""
+    try:
+        records, next_cursor, has_more = collect_changes(request.args.get('since', ''),
+                                                         request.args.get('limit', type=int))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(gzip_jsonl(records), mimetype='application/gzip', headers={
+        'Content-Disposition': f'attachment; filename=changes_{datetime.utcnow():%Y%m%dT%H%M%S}.jsonl.gz',
+        'X-Next-Cursor': next_cursor,
+        'X-Has-More': '1' if has_more else '0',
+    })
+
+
+@admin_bp.route('/users/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+@csrf_protect
+def import_users():
+    """Bulk-create users from an uploaded CSV/JSONL file; the import runs in the background."""
+    if request.method == 'GET':
+        return render_template('admin/import_users.html', roles=IMPORT_ROLES)
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Choose a CSV or JSONL file to import.', 'error')
+        return redirect(url_for('admin.import_users'))
+    default_role = request.form.get('role', 'donor')
+    if default_role not in IMPORT_ROLES:
+        default_role = 'donor'
+    try:
+        job_id = start_import_job(upload, upload.filename, default_role)
+    except RuntimeError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin.import_users'))
+    return redirect(url_for('admin.import_status', job_id=job_id))
+
+
+@admin_bp.route('/users/import/<job_id>')
+@login_required
+@admin_required
+def import_status(job_id):
+    """Progress of a background import, with the report download once it is done."""
+    status = import_job_status(job_id)
+    if status is None:
+        abort(404)
+    return render_template('admin/import_status.html', job_id=job_id, status=status)
+
+
+@admin_bp.route('/users/import/<job_id>/report')
+@login_required
+@admin_required
+def import_report(job_id):
+    """Download a finished import's per-row CSV report (once: it lists temporary passwords)."""
+    data = pop_import_report(job_id)
+    if data is None:
+        flash('That report is not available; it can only be downloaded once.', 'error')
+        return redirect(url_for('admin.import_users'))
+    return send_file(io.BytesIO(data), mimetype='text/csv', as_attachment=True,
+                     download_name='user_import_report.csv')
+
+
+@admin_bp.route('/api/clusters')
+@login_required
+@admin_required
+def map_clusters():
+    """Clusters of available posts for a map viewport: ?bbox=min_lon,min_lat,max_lon,max_lat&zoom=z."""
+    try:
+        bbox = parse_bbox(request.args.get('bbox'))
+        clusters, tiles = get_clusters(*bbox, zoom=request.args.get('zoom', type=int) or 0)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'clusters': clusters, 'tiles': tiles})
@@ -4,6 +4,8 @@ from flask_login import login_user, logout_user, login_required, current_user
 
 from app import db
 from app.models import User
+from app.services.location_service import index_ngo
+from app.unit_of_work import on_commit
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -37,7 +39,7 @@ def register():
             user.latitude = lat
             user.longitude = lon
         db.session.add(user)
-        db.session.commit()
+        on_commit(index_ngo, user)
         flash('Registration successful. Please log in.', 'success')
         return redirect(url_for('auth.login'))
     return render_template('auth/register.html')
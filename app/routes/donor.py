@@ -1,12 +1,19 @@
 """Donor routes."""
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
 
 from app import db
-from app.models import FoodPost, User, Rating
-from app.services.notification_service import notify_food_request_accepted, notify_delivery_completed
+from app.models import FoodPost, Rating, Claim
+from app.sharding import merge_ordered
+from app.services.notification_service import (
+    notify_food_request_accepted, notify_delivery_completed, enqueue_nearby_alerts
+)
+from app.services.cluster_service import invalidate_post_tiles
 from app.services.rating_service import create_rating
+from app.services.tracking_service import get_live_trail, get_last_position, get_persisted_trail, stop_tracking
+from app.unit_of_work import on_commit
 
 donor_bp = Blueprint('donor', __name__)
 
@@ -26,9 +33,12 @@ def donor_required(f):
 @login_required
 @donor_required
 def dashboard():
-    from app.services.location_service import mark_expired_posts
-    mark_expired_posts()
-    posts = FoodPost.query.filter_by(donor_id=current_user.id).order_by(FoodPost.created_at.desc()).all()
+    # Read-only: expiry is written by `manage.py expire`; cards show display_status meanwhile
+    posts = FoodPost.query.options(
+        selectinload(FoodPost.ngo), selectinload(FoodPost.claims).selectinload(Claim.ngo)
+    ).filter_by(
+        donor_id=current_user.id).order_by(FoodPost.created_at.desc()).all()
+    posts = merge_ordered(posts, key=lambda p: p.created_at, reverse=True)
     return render_template('donor/dashboard.html', posts=posts)
 
 
@@ -65,10 +75,18 @@ def create_post():
             delivery_type=delivery_type,
             latitude=lat,
             longitude=lon,
-            address=address or None
+            address=address or None,
+            remaining_quantity=quantity
         )
         db.session.add(post)
-        db.session.commit()
+        db.session.flush()
+        on_commit(invalidate_post_tiles, lat, lon)
+
+        # Reverse match: alert every NGO whose radius covers this post, once the post is committed
+        from app.services.location_service import find_ngos_for_post
+        matches = find_ngos_for_post(lat, lon)
+        if matches and current_app.config.get('NEARBY_ALERTS_ENABLED', True):
+            on_commit(enqueue_nearby_alerts, post.id, matches)
         flash('Food post created successfully.', 'success')
         return redirect(url_for('donor.dashboard'))
     return render_template('donor/create_post.html')
@@ -82,8 +100,7 @@ def post_detail(post_id):
     if post.donor_id != current_user.id:
         flash('Access denied.', 'error')
         return redirect(url_for('donor.dashboard'))
-    ngo = User.query.get(post.ngo_id) if post.ngo_id else None
-    return render_template('donor/post_detail.html', post=post, ngo=ngo)
+    return render_template('donor/post_detail.html', post=post, ngo=post.ngo)
 
 
 @donor_bp.route('/api/post/<int:post_id>/location')
@@ -94,11 +111,40 @@ def post_location(post_id):
     if post.donor_id != current_user.id:
         return jsonify({'error': 'Forbidden'}), 403
     ngo = post.ngo
+    if post.status != 'accepted':
+        stop_tracking(post.id)  # a trail left over from a delivery that is no longer active
+    live = get_last_position(post.id)
     return jsonify({
         'donor_lat': post.latitude,
         'donor_lon': post.longitude,
         'ngo_lat': ngo.latitude if ngo else None,
         'ngo_lon': ngo.longitude if ngo else None,
+        'live_lat': live[0] if live else None,
+        'live_lon': live[1] if live else None,
+    })
+
+
+@donor_bp.route('/api/post/<int:post_id>/trail')
+@login_required
+@donor_required
+def post_trail(post_id):
+    """Return breadcrumb points newer than the `since` cursor."""
+    post = FoodPost.query.get_or_404(post_id)
+    if post.donor_id != current_user.id:
+        return jsonify({'error': 'Forbidden'}), 403
+    since = request.args.get('since', type=int) or 0
+    if post.status != 'accepted':
+        stop_tracking(post.id)
+    points, cursor = get_live_trail(post.id, since)
+    live = points is not None
+    if not live:
+        points = [p for p in get_persisted_trail(post.id) if p[0] > since]
+        cursor = points[-1][0] if points else since
+    return jsonify({
+        'status': post.display_status,
+        'live': live,
+        'points': [[seq, lat, lon, ts] for seq, lat, lon, ts in points],
+        'cursor': cursor,
     })
 
 
@@ -110,7 +156,7 @@ def post_status(post_id):
     if post.donor_id != current_user.id:
         return jsonify({'error': 'Forbidden'}), 403
     return jsonify({
-        'status': post.status,
+        'status': post.display_status,
         'delivered_at': post.delivered_at.isoformat() if post.delivered_at else None,
     })
 
@@ -149,6 +195,37 @@ def rate_ngo(post_id):
     return render_template('donor/rate_ngo.html', post=post, ngo=ngo)
 
 
+@donor_bp.route('/claim/<int:claim_id>/rate-ngo', methods=['GET', 'POST'])
+@login_required
+@donor_required
+def rate_claim_ngo(claim_id):
+    claim = Claim.query.get_or_404(claim_id)
+    post = claim.food_post
+    if post.donor_id != current_user.id or claim.status != 'delivered':
+        flash('You can only rate completed deliveries.', 'error')
+        return redirect(url_for('donor.dashboard'))
+    ngo = claim.ngo
+
+    existing = Rating.query.filter_by(claim_id=claim.id, rater_id=current_user.id).first()
+    if existing:
+        flash('You have already rated this NGO.', 'info')
+        return redirect(url_for('donor.dashboard'))
+
+    if request.method == 'POST':
+        rating_value = request.form.get('rating', type=int) or 5
+        feedback = request.form.get('feedback', '').strip()
+        create_rating(
+            donor_id=post.donor_id, ngo_id=ngo.id, food_id=post.id,
+            rater_id=current_user.id, rated_id=ngo.id,
+            rating_value=rating_value, feedback=feedback, claim_id=claim.id
+        )
+        flash('Thank you for your rating!', 'success')
+        return redirect(url_for('donor.dashboard'))
+
+    return render_template('donor/rate_ngo.html', post=post, ngo=ngo, portions=claim.portions,
+                           action=url_for('donor.rate_claim_ngo', claim_id=claim.id))
+
+
 @donor_bp.route('/api/update-location', methods=['POST'])
 @login_required
 @donor_required
@@ -158,7 +235,6 @@ def update_location():
     if lat is not None and lon is not None:
         current_user.latitude = lat
         current_user.longitude = lon
-        db.session.commit()
         return jsonify({'ok': True})
     return jsonify({'error': 'Invalid coordinates'}), 400
 
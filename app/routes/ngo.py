@@ -1,14 +1,25 @@
 """NGO routes."""
-import threading
 from datetime import datetime
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
 
 from app import db
-from app.models import FoodPost, User, Rating
-from app.services.location_service import get_nearby_food_posts, haversine_km, estimate_travel_time_seconds
-from app.services.notification_service import notify_food_request_accepted, notify_delivery_started, notify_delivery_completed
+from app.csrf import csrf_protect
+from app.models import FoodPost, User, Rating, Claim
+from app.sharding import merge_ordered
+from app.services.location_service import (
+    get_nearby_food_posts, haversine_km, estimate_travel_time_seconds, index_ngo, clamp_match_radius
+)
+from app.services.notification_service import (
+    notify_food_request_accepted, notify_delivery_started, notify_delivery_completed, enqueue_notification
+)
+from app.services.claim_service import claim_portions, accept_whole, complete_claim, claims_for_ngo
+from app.services.cluster_service import get_clusters, parse_bbox
 from app.services.rating_service import create_rating
+from app.services.route_service import pickup_stops_for_ngo, plan_route
+from app.services.tracking_service import record_position, finish_tracking, stop_tracking
+from app.unit_of_work import on_commit
 
 ngo_bp = Blueprint('ngo', __name__)
 
@@ -32,17 +43,40 @@ def dashboard():
     lat = current_user.latitude
     lon = current_user.longitude
     nearby = []
+    radius = clamp_match_radius(current_user.match_radius_km)
+    q = request.args.get('q', '').strip()
     if lat is not None and lon is not None:
-        radius = request.args.get('radius', type=float) or 25
-        nearby = get_nearby_food_posts(lat, lon, radius_km=radius)
+        nearby = get_nearby_food_posts(lat, lon, radius_km=radius, query=q or None)
 
     # Accepted/delivered posts for this NGO
-    my_posts = FoodPost.query.filter(
+    my_posts = FoodPost.query.options(selectinload(FoodPost.donor)).filter(
         FoodPost.ngo_id == current_user.id,
         FoodPost.status.in_(['accepted', 'delivered'])
     ).order_by(FoodPost.accepted_at.desc()).all()
+    my_posts = merge_ordered(my_posts, key=lambda p: p.accepted_at or datetime.min, reverse=True)
 
-    return render_template('ngo/dashboard.html', nearby=nearby, my_posts=my_posts)
+    return render_template('ngo/dashboard.html', nearby=nearby, my_posts=my_posts,
+                           my_claims=claims_for_ngo(current_user.id))
+
+
+@ngo_bp.route('/radius', methods=['POST'])
+@login_required
+@ngo_required
+@csrf_protect
+def set_radius():
+    """Save the NGO's matching radius; it also drives new-post alerts."""
+    radius = request.form.get('radius', type=float)
+    if not radius or radius <= 0:
+        flash('Enter a radius in km.', 'error')
+        return redirect(url_for('ngo.dashboard'))
+    max_radius = current_app.config.get('MAX_MATCH_RADIUS_KM', 100)
+    if radius > max_radius:
+        flash(f'The radius is limited to {max_radius:g} km.', 'info')
+    radius = clamp_match_radius(radius)
+    if radius != current_user.match_radius_km:
+        current_user.match_radius_km = radius
+        on_commit(index_ngo, current_user._get_current_object())
+    return redirect(url_for('ngo.dashboard', q=request.form.get('q') or None))
 
 
 @ngo_bp.route('/post/<int:post_id>/accept', methods=['POST'])
@@ -50,29 +84,68 @@ def dashboard():
 @ngo_required
 def accept_post(post_id):
     post = FoodPost.query.get_or_404(post_id)
-    if post.status != 'available':
-        flash('This post is no longer available.', 'error')
+    # Conditional UPDATE: only one NGO can take an unclaimed post, however many race for it
+    if not accept_whole(post.id, current_user.id):
+        db.session.refresh(post)
+        if post.status == 'available' and post.expiry_time < datetime.utcnow():
+            post.status = 'expired'
+            flash('This post has expired.', 'error')
+        elif post.is_partially_claimed:
+            flash('Part of this post is already claimed; claim the remaining portions instead.', 'error')
+        else:
+            flash('This post is no longer available.', 'error')
         return redirect(url_for('ngo.dashboard'))
+    db.session.refresh(post)
 
-    if post.expiry_time < datetime.utcnow():
-        post.status = 'expired'
-        db.session.commit()
-        flash('This post has expired.', 'error')
-        return redirect(url_for('ngo.dashboard'))
-
-    # Auto-assign this NGO
-    post.ngo_id = current_user.id
-    post.status = 'accepted'
-    post.accepted_at = datetime.utcnow()
-    db.session.commit()
-
-    notify_food_request_accepted(post.donor.email, current_user.name, post.food_type)
+    on_commit(enqueue_notification, notify_food_request_accepted, post.donor.email, current_user.name, post.food_type)
     flash('You have accepted the food.', 'success')
     if post.delivery_type == 'delivery':
         return redirect(url_for('ngo.track_delivery', post_id=post_id))
     return redirect(url_for('ngo.dashboard'))
 
 
+@ngo_bp.route('/post/<int:post_id>/claim', methods=['POST'])
+@login_required
+@ngo_required
+def claim_post(post_id):
+    """Claim some of a post's portions; other NGOs can claim the rest."""
+    post = FoodPost.query.get_or_404(post_id)
+    portions = request.form.get('portions', type=int) or 0
+    if portions <= 0:
+        flash('Enter how many portions you can use.', 'error')
+        return redirect(url_for('ngo.dashboard'))
+    claim = claim_portions(post.id, current_user.id, portions)
+    if claim is None:
+        db.session.refresh(post)
+        if post.status == 'available' and post.portions_left:
+            flash(f'Only {post.portions_left} portions are left.', 'error')
+        else:
+            flash('This post is no longer available.', 'error')
+        return redirect(url_for('ngo.dashboard'))
+
+    on_commit(enqueue_notification, notify_food_request_accepted,
+              post.donor.email, current_user.name, f'{portions} x {post.food_type}')
+    flash(f'You have claimed {portions} portions.', 'success')
+    return redirect(url_for('ngo.dashboard'))
+
+
+@ngo_bp.route('/api/claim/<int:claim_id>/complete', methods=['POST'])
+@login_required
+@ngo_required
+def complete_claim_pickup(claim_id):
+    """Mark this NGO's share of a post as picked up / delivered."""
+    claim = Claim.query.get_or_404(claim_id)
+    if claim.ngo_id != current_user.id:
+        return jsonify({'error': 'Forbidden'}), 403
+    if not complete_claim(claim):
+        return jsonify({'error': 'Invalid state'}), 400
+
+    post = claim.food_post
+    on_commit(enqueue_notification, notify_delivery_completed,
+              post.donor.email, current_user.email, f'{claim.portions} x {post.food_type}')
+    return jsonify({'ok': True, 'status': claim.status})
+
+
 @ngo_bp.route('/track/<int:post_id>')
 @login_required
 @ngo_required
@@ -96,6 +169,19 @@ def track_delivery(post_id):
                           distance_km=round(distance_km, 2), est_minutes=int(est_seconds / 60))
 
 
+@ngo_bp.route('/route')
+@login_required
+@ngo_required
+def pickup_route():
+    """One round trip from the NGO through all open pickups, ordered to collect food before it expires."""
+    if current_user.latitude is None or current_user.longitude is None:
+        flash('Set your location on the dashboard to plan a pickup route.', 'error')
+        return redirect(url_for('ngo.dashboard'))
+    route = plan_route((current_user.latitude, current_user.longitude), pickup_stops_for_ngo(current_user.id))
+    return render_template('ngo/route.html', route=route,
+                           ngo_lat=current_user.latitude, ngo_lon=current_user.longitude)
+
+
 @ngo_bp.route('/api/post/<int:post_id>/start-delivery', methods=['POST'])
 @login_required
 @ngo_required
@@ -106,18 +192,31 @@ def start_delivery(post_id):
     if post.status != 'accepted':
         return jsonify({'error': 'Invalid state'}), 400
     # Send email in background (SMTP may block)
-    donor_email = post.donor.email
-    ngo_email = current_user.email
-    food_type = post.food_type
-    def _send():
-        try:
-            notify_delivery_started(donor_email, ngo_email, food_type)
-        except Exception:
-            pass
-    threading.Thread(target=_send).start()
+    on_commit(enqueue_notification, notify_delivery_started, post.donor.email, current_user.email, post.food_type)
     return jsonify({'ok': True, 'status': 'in_progress'})
 
 
+@ngo_bp.route('/api/post/<int:post_id>/position', methods=['POST'])
+@login_required
+@ngo_required
+def report_position(post_id):
+    """Stream the NGO's live position during an active delivery."""
+    post = FoodPost.query.get_or_404(post_id)
+    if post.ngo_id != current_user.id:
+        return jsonify({'error': 'Forbidden'}), 403
+    if post.status != 'accepted':
+        return jsonify({'error': 'Invalid state'}), 400
+    data = request.get_json(silent=True) or {}
+    try:
+        lat, lon = float(data['latitude']), float(data['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Invalid coordinates'}), 400
+    seq = record_position(post, current_user.id, lat, lon)
+    if seq is None:
+        return jsonify({'error': 'Live tracking is at capacity; try again shortly'}), 503
+    return jsonify({'ok': True, 'seq': seq})
+
+
 @ngo_bp.route('/api/post/<int:post_id>/complete-pickup', methods=['POST'])
 @login_required
 @ngo_required
@@ -133,17 +232,9 @@ def complete_pickup(post_id):
 
     post.status = 'delivered'
     post.delivered_at = datetime.utcnow()
-    db.session.commit()
-
-    donor_email = post.donor.email
-    ngo_email = current_user.email
-    food_type = post.food_type
-    def _send():
-        try:
-            notify_delivery_completed(donor_email, ngo_email, food_type)
-        except Exception:
-            pass
-    threading.Thread(target=_send).start()
+    finish_tracking(post.id)
+    on_commit(stop_tracking, post.id)
+    on_commit(enqueue_notification, notify_delivery_completed, post.donor.email, current_user.email, post.food_type)
 
     return jsonify({'ok': True, 'status': 'delivered'})
 
@@ -160,18 +251,10 @@ def confirm_delivery(post_id):
 
     post.status = 'delivered'
     post.delivered_at = datetime.utcnow()
-    db.session.commit()
-
-    # Send email in background so response returns immediately (SMTP may block/hang)
-    donor_email = post.donor.email
-    ngo_email = current_user.email
-    food_type = post.food_type
-    def _send():
-        try:
-            notify_delivery_completed(donor_email, ngo_email, food_type)
-        except Exception:
-            pass
-    threading.Thread(target=_send).start()
+    finish_tracking(post.id)
+    on_commit(stop_tracking, post.id)
+    # Queued once the delivery is committed, so the response returns immediately (SMTP may block/hang)
+    on_commit(enqueue_notification, notify_delivery_completed, post.donor.email, current_user.email, post.food_type)
 
     return jsonify({'ok': True, 'status': 'delivered'})
 
@@ -206,6 +289,36 @@ def rate_donor(post_id):
     return render_template('ngo/rate_donor.html', post=post)
 
 
+@ngo_bp.route('/claim/<int:claim_id>/rate', methods=['GET', 'POST'])
+@login_required
+@ngo_required
+def rate_claim_donor(claim_id):
+    claim = Claim.query.get_or_404(claim_id)
+    if claim.ngo_id != current_user.id or claim.status != 'delivered':
+        flash('You can only rate completed deliveries.', 'error')
+        return redirect(url_for('ngo.dashboard'))
+    post = claim.food_post
+
+    existing = Rating.query.filter_by(claim_id=claim.id, rater_id=current_user.id).first()
+    if existing:
+        flash('You have already rated this donor.', 'info')
+        return redirect(url_for('ngo.dashboard'))
+
+    if request.method == 'POST':
+        rating_value = request.form.get('rating', type=int) or 5
+        feedback = request.form.get('feedback', '').strip()
+        create_rating(
+            donor_id=post.donor_id, ngo_id=current_user.id, food_id=post.id,
+            rater_id=current_user.id, rated_id=post.donor_id,
+            rating_value=rating_value, feedback=feedback, claim_id=claim.id
+        )
+        flash('Thank you for your rating!', 'success')
+        return redirect(url_for('ngo.dashboard'))
+
+    return render_template('ngo/rate_donor.html', post=post, portions=claim.portions,
+                           action=url_for('ngo.rate_claim_donor', claim_id=claim.id))
+
+
 @ngo_bp.route('/api/update-location', methods=['POST'])
 @login_required
 @ngo_required
@@ -220,6 +333,19 @@ def update_location():
             return jsonify({'error': 'Invalid coordinates'}), 400
         current_user.latitude = lat
         current_user.longitude = lon
-        db.session.commit()
+        on_commit(index_ngo, current_user._get_current_object())
         return jsonify({'ok': True})
     return jsonify({'error': 'Invalid coordinates'}), 400
+
+
+@ngo_bp.route('/api/clusters')
+@login_required
+@ngo_required
+def map_clusters():
+    """Clusters of available posts for a map viewport: ?bbox=min_lon,min_lat,max_lon,max_lat&zoom=z."""
+    try:
+        bbox = parse_bbox(request.args.get('bbox'))
+        clusters, tiles = get_clusters(*bbox, zoom=request.args.get('zoom', type=int) or 0)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'clusters': clusters, 'tiles': tiles})
@@ -0,0 +1,38 @@
+"""Archival of long-expired, never-claimed food posts out of the live tables."""
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Claim, DeletedRow, FoodPost
+from app.services.export_service import FEED_TABLES, row_record
+from app.sharding import get_router, use_regions
+
+
+def iter_archive_expired_posts(older_than_days: int, batch_size: int = 1000):
+    """
+    Delete posts that expired unclaimed more than `older_than_days` ago, one
+    region shard and id batch at a time. Yields each batch as change-feed
+    records (op 'archive') before the caller commits the delete, so the batch
+    can be written out first. Each delete leaves a tombstone in the same shard
+    and transaction, which the change feed exports as op 'delete'. Claimed or delivered posts are kept: ratings,
+    claims and delivery tracks still refer to them.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    cols = [getattr(FoodPost, f) for f in FEED_TABLES['food_post'][1]]
+    unclaimed = ~db.exists().where(Claim.food_id == FoodPost.id)
+    for region in get_router().names:
+        with use_regions([region]):
+            last_id = 0
+            while True:
+                rows = db.session.query(*cols).filter(
+                    FoodPost.id > last_id,
+                    FoodPost.status == 'expired',
+                    FoodPost.expiry_time < cutoff,
+                    unclaimed
+                ).order_by(FoodPost.id).limit(batch_size).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                FoodPost.query.filter(FoodPost.id.in_([r.id for r in rows])).delete(synchronize_session=False)
+                db.session.execute(DeletedRow.__table__.insert(),
+                                   [{'table_name': 'food_post', 'row_id': r.id} for r in rows])
+                yield [row_record('food_post', r, op='archive') for r in rows]
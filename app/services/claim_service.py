@@ -0,0 +1,93 @@
+"""Partial claims: many NGOs share one large food post without locks or over-allocation."""
+from datetime import datetime
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import selectinload
+
+from app import db
+from app.models import Claim, FoodPost
+from app.services.cluster_service import invalidate_post
+from app.sharding import get_router, merge_ordered, use_regions
+from app.unit_of_work import on_commit
+
+
+def _remaining():
+    # Rows created before claims existed have no remaining_quantity yet
+    return func.coalesce(FoodPost.remaining_quantity, FoodPost.quantity)
+
+
+def claim_portions(post_id: int, ngo_id: int, portions: int):
+    """
+    Atomically take `portions` from an available post and record a Claim.
+    The availability check and the decrement are one conditional UPDATE, so
+    concurrent claimers can never push remaining_quantity below zero; the
+    loser of a race simply matches no row. Returns the Claim, or None; the
+    caller commits.
+    """
+    if portions <= 0:
+        return None
+    now = datetime.utcnow()
+    remaining = _remaining()
+    with use_regions([get_router().region_for_post_id(post_id)]):
+        taken = FoodPost.query.filter(
+            FoodPost.id == post_id,
+            FoodPost.status == 'available',
+            FoodPost.expiry_time > now,
+            remaining >= portions
+        ).update({
+            FoodPost.remaining_quantity: remaining - portions,
+            # The last portions close the post to further claims
+            FoodPost.status: case((remaining == portions, 'accepted'), else_=FoodPost.status),
+            FoodPost.accepted_at: case((remaining == portions, now), else_=FoodPost.accepted_at),
+        }, synchronize_session=False)
+        if taken != 1:
+            return None
+        claim = Claim(food_id=post_id, ngo_id=ngo_id, portions=portions, accepted_at=now)
+        db.session.add(claim)
+    on_commit(invalidate_post, post_id)
+    return claim
+
+
+def accept_whole(post_id: int, ngo_id: int) -> bool:
+    """Accept an entire unclaimed post for one NGO. Conditional UPDATE, so only one NGO can win."""
+    now = datetime.utcnow()
+    with use_regions([get_router().region_for_post_id(post_id)]):
+        taken = FoodPost.query.filter(
+            FoodPost.id == post_id,
+            FoodPost.status == 'available',
+            FoodPost.expiry_time > now,
+            _remaining() == FoodPost.quantity
+        ).update({
+            FoodPost.ngo_id: ngo_id,
+            FoodPost.status: 'accepted',
+            FoodPost.accepted_at: now,
+            FoodPost.remaining_quantity: 0,
+        }, synchronize_session=False)
+    if taken == 1:
+        on_commit(invalidate_post, post_id)
+    return taken == 1
+
+
+def complete_claim(claim: Claim) -> bool:
+    """Mark a claim delivered; the post is delivered once it is fully claimed and every claim is delivered."""
+    if claim.status != 'accepted':
+        return False
+    now = datetime.utcnow()
+    claim.status = 'delivered'
+    claim.delivered_at = now
+    db.session.flush()
+    post = claim.food_post
+    with use_regions([get_router().region_for_post_id(post.id)]):
+        open_claims = Claim.query.filter(Claim.food_id == post.id, Claim.status != 'delivered').count()
+    if post.status == 'accepted' and post.remaining_quantity == 0 and open_claims == 0:
+        post.status = 'delivered'
+        post.delivered_at = now
+    return True
+
+
+def claims_for_ngo(ngo_id: int):
+    """All claims made by an NGO, newest first, with their posts loaded."""
+    claims = Claim.query.options(selectinload(Claim.food_post)).filter(
+        Claim.ngo_id == ngo_id
+    ).order_by(Claim.accepted_at.desc()).all()
+    return merge_ordered(claims, key=lambda c: c.accepted_at, reverse=True)
@@ -0,0 +1,200 @@
+"""Server-side clustering of available posts for map views, cached per map tile."""
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+
+MAX_ZOOM = 18
+MAX_LAT = 85.05112878  # Web Mercator limit
+MAX_TILES_PER_REQUEST = 64
+
+
+def _tile_xy(lat: float, lon: float, zoom: int):
+    """Slippy-map tile containing a point (same tiling as the Leaflet/OSM base layer)."""
+    n = 2 ** zoom
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _tile_bounds(zoom: int, x: int, y: int):
+    """(min_lat, min_lon, max_lat, max_lon) of a tile."""
+    n = 2 ** zoom
+
+    def lat_of(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+    return lat_of(y + 1), x / n * 360.0 - 180.0, lat_of(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tiles_for_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float, zoom: int):
+    x0, y0 = _tile_xy(max_lat, min_lon, zoom)
+    x1, y1 = _tile_xy(min_lat, max_lon, zoom)
+    return [(zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+class TileClusterCache:
+    """
+    Bounded LRU of per-tile cluster lists. An entry is dropped when a post in
+    its tile changes state, when the earliest-expiring post in it expires, or
+    after `ttl` seconds (the bound on staleness across worker processes).
+    """
+
+    def __init__(self, max_tiles: int = 4096, ttl: float = 30.0):
+        self.max_tiles = max_tiles
+        self.ttl = ttl
+        self._tiles = OrderedDict()  # (z, x, y) -> (clusters, fresh_until_monotonic, valid_until_utc)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None:
+                clusters, fresh_until, valid_until = entry
+                if time.monotonic() < fresh_until and (valid_until is None or datetime.utcnow() < valid_until):
+                    self._tiles.move_to_end(key)
+                    self.hits += 1
+                    return clusters
+                del self._tiles[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, clusters, valid_until=None):
+        with self._lock:
+            self._tiles[key] = (clusters, time.monotonic() + self.ttl, valid_until)
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+    def invalidate_point(self, lat: float, lon: float):
+        """Drop the tile containing (lat, lon) at every zoom level."""
+        with self._lock:
+            for zoom in range(MAX_ZOOM + 1):
+                self._tiles.pop((zoom,) + _tile_xy(lat, lon, zoom), None)
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+
+    def __len__(self):
+        return len(self._tiles)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cluster_cache() -> TileClusterCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TileClusterCache(current_app.config.get('CLUSTER_CACHE_TILES', 4096),
+                                          current_app.config.get('CLUSTER_CACHE_TTL', 30))
+    return _cache
+
+
+def invalidate_post_tiles(lat: float, lon: float):
+    """Call after a post is created, claimed, accepted or otherwise leaves/changes in the available set."""
+    if _cache is not None and lat is not None and lon is not None:
+        _cache.invalidate_point(lat, lon)
+
+
+def invalidate_post(post_id: int):
+    """invalidate_post_tiles for callers that only hold the post id."""
+    if _cache is None:
+        return
+    from app import db
+    from app.models import FoodPost
+    post = db.session.get(FoodPost, post_id)
+    if post is not None:
+        _cache.invalidate_point(post.latitude, post.longitude)
+
+
+def _compute_tile(zoom: int, x: int, y: int, grid: int):
+    """Aggregate available posts in one tile into at most grid x grid clusters."""
+    from app import db
+    from app.models import FoodPost
+    from app.sharding import get_router, use_regions
+
+    min_lat, min_lon, max_lat, max_lon = _tile_bounds(zoom, x, y)
+    now = datetime.utcnow()
+    mid_lat, mid_lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+    half_diag_km = math.hypot((max_lat - min_lat) * 111.32,
+                              (max_lon - min_lon) * 111.32 * math.cos(math.radians(mid_lat))) / 2
+    with use_regions(get_router().regions_near(mid_lat, mid_lon, half_diag_km)):
+        rows = db.session.query(
+            FoodPost.id, FoodPost.latitude, FoodPost.longitude,
+            db.func.coalesce(FoodPost.remaining_quantity, FoodPost.quantity), FoodPost.expiry_time
+        ).filter(
+            FoodPost.status == 'available',
+            FoodPost.expiry_time > now,
+            FoodPost.latitude >= min_lat, FoodPost.latitude < max_lat,
+            FoodPost.longitude >= min_lon, FoodPost.longitude < max_lon
+        ).all()
+
+    # Cells are equal slices of the tile in Mercator space, so clusters look evenly spaced on screen
+    n = 2 ** zoom
+    cells = {}
+    valid_until = None
+    for post_id, lat, lon, portions, expiry in rows:
+        px = (lon + 180.0) / 360.0 * n - x
+        py = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n - y
+        key = (min(int(px * grid), grid - 1), min(int(py * grid), grid - 1))
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = [1, lat, lon, portions or 0, post_id]
+        else:
+            cell[0] += 1
+            cell[1] += lat
+            cell[2] += lon
+            cell[3] += portions or 0
+        if valid_until is None or expiry < valid_until:
+            valid_until = expiry
+
+    clusters = []
+    for count, sum_lat, sum_lon, portions, post_id in cells.values():
+        cluster = {'lat': round(sum_lat / count, 6), 'lon': round(sum_lon / count, 6),
+                   'count': count, 'portions': portions}
+        if count == 1:
+            cluster['post_id'] = post_id
+        clusters.append(cluster)
+    return clusters, valid_until
+
+
+def get_clusters(min_lat: float, min_lon: float, max_lat: float, max_lon: float, zoom: int):
+    """
+    Clusters of available posts covering a viewport. Payload is bounded by the
+    number of tiles in view times grid^2, however many posts there are.
+    Returns (clusters, tile_count) or raises ValueError for oversized requests.
+    """
+    zoom = max(0, min(int(zoom), MAX_ZOOM))
+    tiles = tiles_for_bbox(min_lat, min_lon, max_lat, max_lon, zoom)
+    if len(tiles) > MAX_TILES_PER_REQUEST:
+        raise ValueError('Bounding box too large for this zoom level')
+    grid = current_app.config.get('CLUSTER_GRID_SIZE', 8)
+    cache = get_cluster_cache()
+    clusters = []
+    for tile in tiles:
+        tile_clusters = cache.get(tile)
+        if tile_clusters is None:
+            tile_clusters, valid_until = _compute_tile(*tile, grid)
+            cache.put(tile, tile_clusters, valid_until)
+        clusters.extend(tile_clusters)
+    return clusters, len(tiles)
+
+
+def parse_bbox(value: str):
+    """'min_lon,min_lat,max_lon,max_lat' (Leaflet's toBBoxString order) -> (min_lat, min_lon, max_lat, max_lon)."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in (value or '').split(','))
+    except ValueError:
+        raise ValueError('bbox must be min_lon,min_lat,max_lon,max_lat')
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError('bbox min must not exceed max')
+    return (max(min_lat, -MAX_LAT), max(min_lon, -180.0), min(max_lat, MAX_LAT), min(max_lon, 180.0))
@@ -0,0 +1,122 @@
+"""Incremental change feed: rows changed since a cursor, as gzip-compressed JSON Lines."""
+import base64
+import json
+import zlib
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import DeletedRow, FoodPost, Rating, User
+from app.sharding import SHARDED_TABLES, merge_ordered
+
+FEED_VERSION = 1
+# Stable, explicit schema per table: new columns are appended, never renamed or dropped
+FEED_TABLES = {
+    'user': (User, ['id', 'name', 'email', 'role', 'latitude', 'longitude', 'match_radius_km',
+                    'average_rating', 'rating_count', 'trust_score', 'created_at', 'updated_at']),
+    'food_post': (FoodPost, ['id', 'donor_id', 'ngo_id', 'food_type', 'quantity', 'remaining_quantity',
+                             'status', 'delivery_type', 'latitude', 'longitude', 'address', 'expiry_time',
+                             'created_at', 'accepted_at', 'delivered_at', 'updated_at']),
+    'rating': (Rating, ['id', 'donor_id', 'ngo_id', 'food_id', 'claim_id', 'rater_id', 'rated_id',
+                        'rating_value', 'feedback', 'created_at', 'updated_at']),
+}
+# Deletes from the tables above, exported as op 'delete' records under their own cursor position
+TOMBSTONES = (DeletedRow, ['id', 'table_name', 'row_id', 'updated_at'])
+_TOMBSTONE_POSITION = 'deleted_row'
+_END_OF_STAMP = 2 ** 63 - 1  # id sentinel: every row at this timestamp has been exported
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(positions: dict) -> str:
+    payload = {table: [ts.isoformat(), row_id] for table, (ts, row_id) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps({'v': FEED_VERSION, 'pos': payload}).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Cursor -> {table: (updated_at, id)}. An empty cursor starts from the beginning."""
+    if not cursor:
+        return {}
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if raw.get('v') != FEED_VERSION:
+            raise InvalidCursor('Cursor is from an incompatible feed version')
+        return {table: (datetime.fromisoformat(ts), int(row_id))
+                for table, (ts, row_id) in raw['pos'].items() if table in FEED_TABLES or table == _TOMBSTONE_POSITION}
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor('Malformed cursor')
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def row_record(table: str, row, op: str = 'upsert') -> dict:
+    """One feed line for a row selected with the table's FEED_TABLES fields."""
+    return {
+        'table': table,
+        'op': op,
+        'id': row.id,
+        'updated_at': _json_value(row.updated_at),
+        'row': {f: _json_value(getattr(row, f)) for f in FEED_TABLES[table][1]},
+    }
+
+
+def tombstone_record(row) -> dict:
+    """One feed line for a deleted row: its table and id, and when it was deleted."""
+    return {'table': row.table_name, 'op': 'delete', 'id': row.row_id, 'updated_at': _json_value(row.updated_at)}
+
+
+def _changed_rows(model, fields, after, upto: datetime, limit: int):
+    """Keyset page over (updated_at, id): served by the updated_at index, cost grows with changes only."""
+    cols = [getattr(model, f) for f in fields]
+    query = db.session.query(*cols).filter(model.updated_at <= upto)
+    if after is not None:
+        ts, row_id = after
+        query = query.filter(db.or_(model.updated_at > ts, db.and_(model.updated_at == ts, model.id > row_id)))
+    rows = query.order_by(model.updated_at, model.id).limit(limit).all()
+    if model.__table__.name in SHARDED_TABLES:
+        # Each region shard returned its own first page; keep the global first page
+        rows = merge_ordered(rows, key=lambda r: (r.updated_at, r.id))[:limit]
+    return rows
+
+
+def collect_changes(cursor: str = None, limit: int = None):
+    """
+    Return (records, next_cursor, has_more) for rows changed after `cursor`.
+
+    Deleted rows follow the upserts as op 'delete' records. At most `limit`
+    rows per table are returned; has_more says to call again with
+    next_cursor. Rows touched in the last CHANGE_FEED_LAG_SECONDS are held
+    back to the next sync so a transaction still in flight is never skipped.
+    """
+    limit = limit or current_app.config.get('CHANGE_FEED_PAGE_SIZE', 10000)
+    upto = datetime.utcnow() - timedelta(seconds=current_app.config.get('CHANGE_FEED_LAG_SECONDS', 5))
+    positions = decode_cursor(cursor)
+    records = []
+    has_more = False
+    for table, (model, fields) in [*FEED_TABLES.items(), (_TOMBSTONE_POSITION, TOMBSTONES)]:
+        after = positions.get(table)
+        rows = _changed_rows(model, fields, after, upto, limit)
+        records.extend(tombstone_record(row) if model is DeletedRow else row_record(table, row) for row in rows)
+        if len(rows) == limit:
+            has_more = True
+            positions[table] = (rows[-1].updated_at, rows[-1].id)
+        elif after is None or upto >= after[0]:
+            positions[table] = (upto, _END_OF_STAMP)
+    return records, encode_cursor(positions), has_more
+
+
+def gzip_jsonl(records):
+    """Yield a gzip stream of one compact JSON object per line, compressed incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for record in records:
+        chunk = compressor.compress(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+        if chunk:
+            yield chunk
+    yield compressor.flush()
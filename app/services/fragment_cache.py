@@ -0,0 +1,74 @@
+"""Bounded LRU cache of rendered per-post template fragments (cards, table rows)."""
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """
+    Thread-safe LRU of rendered HTML keyed by (template, version key).
+    Keys carry the row's version (updated_at), so a state transition makes the
+    old entry unreachable and it ages out; nothing has to be purged by hand.
+    """
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_fragment_cache() -> FragmentCache:
+    cache = current_app.extensions.get('fragment_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'fragment_cache', FragmentCache(current_app.config.get('FRAGMENT_CACHE_SIZE', 20000)))
+    return cache
+
+
+def render_fragment(template_name: str, key: tuple, **context) -> Markup:
+    """
+    Render a partial's `render` macro once per (template, key) and reuse the HTML.
+    `key` must cover everything the partial shows: the row id and version plus
+    any per-viewer or time-dependent inputs (distance, expiring-soon flag).
+    """
+    # A macro call reuses the template module built once with the env globals (url_for,
+    # config, request), so a miss costs about the same as rendering the row inline
+    render = current_app.jinja_env.get_template(template_name).module.render
+    if not current_app.config.get('FRAGMENT_CACHE_ENABLED', True):
+        return Markup(render(**context))
+    cache = get_fragment_cache()
+    full_key = (template_name,) + tuple(key)
+    html = cache.get(full_key)
+    if html is None:
+        html = Markup(render(**context))
+        cache.put(full_key, html)
+    return html
@@ -0,0 +1,301 @@
+"""Bulk user import from partner lists (CSV or JSON Lines)."""
+import csv
+import io
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+# Partner onboarding only: admin accounts are never created from an uploaded file
+IMPORT_ROLES = ('donor', 'ngo')
+REPORT_FIELDS = ['row', 'email', 'status', 'message', 'temp_password']
+# Stay under SQLite's bound-parameter limit when checking emails in one IN (...)
+_MAX_IN_PARAMS = 30000
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{16}$')
+# One background import per process: each one already uses every CPU for hashing
+_job_lock = threading.Lock()
+
+
+def detect_format(filename: str) -> str:
+    return 'jsonl' if (filename or '').lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(stream, fmt: str = 'csv'):
+    """Yield one dict per record from a text stream; unparseable JSON lines yield {'_error': ...}."""
+    if fmt != 'jsonl':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {'_error': f'Invalid JSON: {e}'}
+            continue
+        yield record if isinstance(record, dict) else {'_error': 'Expected a JSON object'}
+
+
+def _result(row: int, email: str, status: str, message: str = '', temp_password: str = ''):
+    return {'row': row, 'email': email, 'status': status, 'message': message, 'temp_password': temp_password}
+
+
+def _float_or_none(value, field: str):
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {field}')
+
+
+def validate_row(record: dict, default_role: str = 'donor'):
+    """Normalise one record into User column values plus its plaintext password. Raises ValueError."""
+    if '_error' in record:
+        raise ValueError(record['_error'])
+    name = str(record.get('name') or '').strip()
+    email = str(record.get('email') or '').strip().lower()
+    role = str(record.get('role') or default_role).strip().lower()
+    if not name:
+        raise ValueError('Name is required')
+    if not EMAIL_RE.match(email):
+        raise ValueError('Invalid email')
+    if role not in IMPORT_ROLES:
+        raise ValueError(f'Role {role!r} cannot be imported; use donor or ngo')
+    lat = _float_or_none(record.get('latitude'), 'latitude')
+    lon = _float_or_none(record.get('longitude'), 'longitude')
+    if (lat is None) != (lon is None) or (lat is not None and not (-90 <= lat <= 90 and -180 <= lon <= 180)):
+        raise ValueError('Invalid coordinates')
+    radius = _float_or_none(record.get('match_radius_km'), 'match_radius_km')
+    if radius is not None and not 0 < radius <= current_app.config.get('MAX_MATCH_RADIUS_KM', 100):
+        raise ValueError('Invalid match_radius_km')
+    values = {
+        'name': name[:128], 'email': email, 'role': role, 'latitude': lat, 'longitude': lon,
+        'match_radius_km': radius,
+    }
+    return values, str(record.get('password') or '')
+
+
+def _existing_emails(emails):
+    """Emails already registered; one query for any realistic batch."""
+    found = set()
+    emails = list(emails)
+    for i in range(0, len(emails), _MAX_IN_PARAMS):
+        found.update(e for (e,) in db.session.query(User.email).filter(User.email.in_(emails[i:i + _MAX_IN_PARAMS])))
+    return found
+
+
+def _insert_chunk(chunk):
+    """
+    Insert one chunk in its own transaction. Returns {email: reason} for rows
+    left out because another signup registered the email first.
+    """
+    try:
+        db.session.execute(User.__table__.insert(), [values for _, values, _ in chunk])
+        db.session.commit()
+        return {}
+    except IntegrityError:
+        db.session.rollback()
+    skipped = dict.fromkeys(_existing_emails(values['email'] for _, values, _ in chunk), 'Email already registered')
+    rest = [values for _, values, _ in chunk if values['email'] not in skipped]
+    if rest:
+        try:
+            db.session.execute(User.__table__.insert(), rest)
+            db.session.commit()
+        except IntegrityError:
+            # Lost a second race within the chunk: report the rest rather than retry indefinitely
+            db.session.rollback()
+            skipped.update(dict.fromkeys((values['email'] for values in rest),
+                                         'Conflicted with a concurrent signup; import again to retry'))
+    return skipped
+
+
+def import_users(records, default_role: str = 'donor', chunk_size: int = None, workers: int = None):
+    """
+    Validate, dedupe and insert users, yielding one report dict per input row.
+
+    Emails are checked against the database in a single query. Password
+    hashing (the dominant cost) is spread over a process pool and pipelined
+    with the inserts: every chunk's hashes are submitted up front, and each
+    chunk is committed in its own transaction as soon as its hashes are ready,
+    so results stream out while later chunks are still hashing.
+    """
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', 500)
+    workers = workers or current_app.config.get('IMPORT_HASH_WORKERS') or os.cpu_count() or 1
+
+    pending = []  # (row, values, plaintext password, generated?)
+    seen = set()
+    for row, record in enumerate(records, start=1):
+        try:
+            values, password = validate_row(record, default_role)
+        except ValueError as e:
+            yield _result(row, str(record.get('email') or ''), 'error', str(e))
+            continue
+        if values['email'] in seen:
+            yield _result(row, values['email'], 'skipped', 'Duplicate email in file')
+            continue
+        seen.add(values['email'])
+        pending.append((row, values, password or secrets.token_urlsafe(9), not password))
+
+    existing = _existing_emails(seen)
+    for row, values, _, _ in pending:
+        if values['email'] in existing:
+            yield _result(row, values['email'], 'skipped', 'Email already registered')
+    pending = [p for p in pending if p[1]['email'] not in existing]
+    if not pending:
+        return
+
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    pool = None
+    if workers > 1 and len(pending) > workers:
+        # spawn, not fork: the caller may be a threaded server holding DB connections
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+    imported_ngo = False
+    try:
+        hashed = []
+        for chunk in chunks:
+            passwords = [p[2] for p in chunk]
+            hashed.append(pool.map(generate_password_hash, passwords, chunksize=max(1, len(passwords) // workers))
+                          if pool else map(generate_password_hash, passwords))
+        for chunk, hashes in zip(chunks, hashed):
+            batch = []
+            for (row, values, password, generated), password_hash in zip(chunk, hashes):
+                batch.append((row, dict(values, password_hash=password_hash), password if generated else ''))
+            skipped = _insert_chunk(batch)
+            for row, values, temp_password in batch:
+                if values['email'] in skipped:
+                    yield _result(row, values['email'], 'skipped', skipped[values['email']])
+                else:
+                    imported_ngo = imported_ngo or values['role'] == 'ngo'
+                    yield _result(row, values['email'], 'created', temp_password=temp_password)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        if imported_ngo:
+            from app.services.location_service import reset_ngo_index
+            reset_ngo_index()  # rebuilt from the database on the next lookup
+
+
+def report_lines(results, counts: dict = None):
+    """Render report dicts as CSV text, one line per row, so callers can stream progress."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    for result in results:
+        writer.writerow(result)
+        if counts is not None:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _job_dir():
+    path = current_app.config.get('IMPORT_JOB_DIR') or os.path.join(current_app.instance_path, 'imports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _job_path(job_id: str, suffix: str):
+    if not _JOB_ID_RE.match(job_id or ''):
+        return None
+    return os.path.join(_job_dir(), job_id + suffix)
+
+
+def _write_status(job_id: str, status: dict):
+    path = _job_path(job_id, '.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(status, f)
+    os.replace(path + '.tmp', path)  # readers never see a half-written file
+
+
+def start_import_job(upload, filename: str, default_role: str = 'donor') -> str:
+    """
+    Save an uploaded file and import it on a background thread, so the request
+    returns at once. Returns the job id for import_job_status(). Raises
+    RuntimeError if this process is already running an import.
+    """
+    if not _job_lock.acquire(blocking=False):
+        raise RuntimeError('Another import is still running; try again when it finishes.')
+    try:
+        job_id = secrets.token_hex(8)
+        source = _job_path(job_id, '.upload')
+        upload.save(source)
+        _write_status(job_id, {'state': 'running', 'filename': filename, 'rows': 0, 'counts': {},
+                               'started': time.time(), 'finished': None, 'error': None})
+        app = current_app._get_current_object()
+        threading.Thread(target=_run_import_job, args=(app, job_id, source, detect_format(filename), default_role),
+                         daemon=True, name=f'user-import-{job_id}').start()
+    except BaseException:
+        _job_lock.release()
+        raise
+    return job_id
+
+
+def _run_import_job(app, job_id: str, source: str, fmt: str, default_role: str):
+    with app.app_context():
+        status = import_job_status(job_id)
+        counts = {}
+        report = _job_path(job_id, '.csv')
+        try:
+            # The report holds temporary passwords: readable by the app user only
+            fd = os.open(report + '.part', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'w', newline='', encoding='utf-8') as out, open(source, newline='', encoding='utf-8-sig') as f:
+                results = import_users(read_rows(f, fmt), default_role=default_role)
+                for n, line in enumerate(report_lines(results, counts)):
+                    out.write(line)
+                    if n and n % 1000 == 0:
+                        _write_status(job_id, dict(status, rows=n, counts=counts))
+            os.replace(report + '.part', report)
+            status['state'] = 'done'
+        except Exception as e:
+            app.logger.exception(f'User import {job_id} failed')
+            status.update(state='failed', error=str(e))
+            if os.path.exists(report + '.part'):
+                os.remove(report + '.part')
+        finally:
+            db.session.remove()
+            os.remove(source)
+            status.update(rows=sum(counts.values()), counts=counts, finished=time.time())
+            _write_status(job_id, status)
+            _job_lock.release()
+
+
+def import_job_status(job_id: str):
+    """The job's status dict (state running/done/failed, rows, counts per status), or None if unknown."""
+    path = _job_path(job_id, '.json')
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def pop_import_report(job_id: str):
+    """
+    Return the finished job's report CSV and delete it, since it lists
+    temporary passwords; None if the job is unknown, unfinished or the report
+    was already downloaded.
+    """
+    path = _job_path(job_id, '.csv')
+    if path is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    os.remove(path)
+    return data
@@ -1,10 +1,12 @@
 """Location-based services using Haversine formula."""
 import math
+import threading
 from datetime import datetime
 
 from flask import current_app
 
-
+_ngo_index = None
+_ngo_index_lock = threading.Lock()
 
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -20,32 +22,52 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return R * c
 
 
-def mark_expired_posts():
-    """Mark posts past expiry_time as expired."""
+def iter_expire_posts(batch_size: int = 1000):
+    """
+    Expiry sweep for maintenance jobs: marks expired posts in id batches, one
+    region shard at a time, yielding the count after each batch so the caller
+    can commit and report progress between batches.
+    """
     from app.models import FoodPost
-    from app import db
-    FoodPost.query.filter(
-        FoodPost.status == 'available',
-        FoodPost.expiry_time <= datetime.utcnow()
-    ).update({FoodPost.status: 'expired'}, synchronize_session=False)
-    db.session.commit()
-
-
-def get_nearby_food_posts(ngo_lat: float, ngo_lon: float, radius_km: float = None):
+    from app.sharding import get_router, use_regions
+
+    for region in get_router().names:
+        with use_regions([region]):
+            while True:
+                ids = [row.id for row in FoodPost.query.with_entities(FoodPost.id).filter(
+                    FoodPost.status == 'available',
+                    FoodPost.expiry_time <= datetime.utcnow()
+                ).order_by(FoodPost.id).limit(batch_size)]
+                if not ids:
+                    break
+                FoodPost.query.filter(FoodPost.id.in_(ids), FoodPost.status == 'available').update(
+                    {FoodPost.status: 'expired'}, synchronize_session=False)
+                yield len(ids)
+
+
+def get_nearby_food_posts(ngo_lat: float, ngo_lon: float, radius_km: float = None, query: str = None):
     """
     Fetch nearby available food posts within radius, sorted by distance.
-    Excludes expired posts.
+    Excludes expired posts by expiry_time, so this read path never writes.
+    An optional text query narrows by food type/address.
     """
     from app.models import FoodPost
+    from app.services.search_service import apply_search
 
     if radius_km is None:
         radius_km = current_app.config.get('MATCH_RADIUS_KM', 25)
 
-    mark_expired_posts()
-    posts = FoodPost.query.filter(
-        FoodPost.status == 'available',
-        FoodPost.expiry_time > datetime.utcnow()
-    ).all()
+    from app.sharding import get_router, use_regions
+
+    # Only the region shards that can hold posts within the radius are touched
+    with use_regions(get_router().regions_near(ngo_lat, ngo_lon, radius_km)):
+        posts = FoodPost.query.filter(
+            FoodPost.status == 'available',
+            FoodPost.expiry_time > datetime.utcnow()
+        )
+        if query:
+            posts = apply_search(posts, query)
+        posts = posts.all()
 
     results = []
     for post in posts:
@@ -60,7 +82,62 @@ def get_nearby_food_posts(ngo_lat: float, ngo_lon: float, radius_km: float = Non
     return results
 
 
+def clamp_match_radius(radius_km: float = None) -> float:
+    """An NGO's matching radius limited to MAX_MATCH_RADIUS_KM; unset or non-positive falls back to MATCH_RADIUS_KM."""
+    default = current_app.config.get('MATCH_RADIUS_KM', 25)
+    if not radius_km or radius_km <= 0:
+        radius_km = default
+    return min(radius_km, current_app.config.get('MAX_MATCH_RADIUS_KM', 100))
+
+
 def estimate_travel_time_seconds(distance_km: float, avg_speed_kmh: float = 25) -> float:
     """Estimate travel time in seconds. Default 25 km/h average city speed."""
     hours = distance_km / avg_speed_kmh
     return hours * 3600
+
+
+def get_ngo_index():
+    """Return the grid index of NGO locations, building it from the database on first use."""
+    global _ngo_index
+    if _ngo_index is None:
+        with _ngo_index_lock:
+            if _ngo_index is None:
+                from app.models import User
+                from app.services.spatial_index import GridIndex
+                index = GridIndex(cell_deg=current_app.config.get('SPATIAL_CELL_DEG', 0.25))
+                rows = User.query.with_entities(
+                    User.id, User.latitude, User.longitude, User.match_radius_km
+                ).filter(
+                    User.role == 'ngo',
+                    User.latitude.isnot(None),
+                    User.longitude.isnot(None)
+                )
+                for user_id, lat, lon, radius in rows:
+                    index.upsert(user_id, lat, lon, clamp_match_radius(radius))
+                _ngo_index = index
+    return _ngo_index
+
+
+def reset_ngo_index():
+    """Drop the NGO index so the next lookup rebuilds it from the database."""
+    global _ngo_index
+    with _ngo_index_lock:
+        _ngo_index = None
+
+
+def index_ngo(user):
+    """Add or move an NGO in the index after its location or match radius changes."""
+    if _ngo_index is None or user.role != 'ngo':
+        return  # built lazily from current data on first lookup
+    if user.latitude is None or user.longitude is None:
+        _ngo_index.remove(user.id)
+        return
+    _ngo_index.upsert(user.id, user.latitude, user.longitude, clamp_match_radius(user.match_radius_km))
+
+
+def find_ngos_for_post(lat: float, lon: float):
+    """
+    Reverse match: NGOs whose configured radius covers the given post location.
+    Returns [(ngo_id, distance_km), ...] sorted by distance.
+    """
+    return [(ngo_id, round(dist, 2)) for ngo_id, dist in get_ngo_index().covering(lat, lon)]
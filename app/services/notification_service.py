@@ -1,28 +1,90 @@
 """Local SMTP email notifications (no external API)."""
+import queue
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import current_app
 
+from app import db
 
 
-def _send_email(to_email: str, subject: str, body_text: str):
-    """Send email via local SMTP."""
-    try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = current_app.config.get('MAIL_DEFAULT_SENDER', 'noreply@surpluslink.local')
-        msg['To'] = to_email
-        msg.attach(MIMEText(body_text, 'plain'))
+class Outbox:
+    """A queue of notification calls drained by one daemon thread, started on first use."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def put(self, func, args):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    app = current_app._get_current_object()
+                    self._worker = threading.Thread(target=self._run, args=(app,), daemon=True, name=self.name)
+                    self._worker.start()
+        self.queue.put((func, args))
+
+    def _run(self, app):
+        while True:
+            func, args = self.queue.get()
+            try:
+                with app.app_context():
+                    func(*args)
+            except Exception as e:
+                app.logger.warning(f"Queued notification failed: {e}")
+            finally:
+                self.queue.task_done()
+
 
+# Delivery/acceptance mail and new-post alert fan-outs are drained separately,
+# so a post that matches thousands of NGOs never delays a donor's "accepted" mail
+_outbox = Outbox('notification-outbox')
+_alert_outbox = Outbox('nearby-alert-outbox')
+
+
+def enqueue_notification(func, *args):
+    """Run a notification function on the background worker so the request is not blocked by SMTP."""
+    _outbox.put(func, args)
+
+
+def enqueue_nearby_alerts(post_id: int, matches):
+    """Queue the new-post alerts for one post on the alert worker."""
+    _alert_outbox.put(send_nearby_post_alerts, (post_id, matches))
+
+
+def _send_emails(messages) -> int:
+    """
+    Send [(to_email, subject, body_text), ...] over one local SMTP connection.
+    A server that is down costs one connect timeout for the whole batch, not
+    one per message. Returns the number sent.
+    """
+    sent = 0
+    try:
+        sender = current_app.config.get('MAIL_DEFAULT_SENDER', 'noreply@surpluslink.local')
         with smtplib.SMTP(
             current_app.config.get('MAIL_SERVER', 'localhost'),
             current_app.config.get('MAIL_PORT', 1025),
             timeout=5
         ) as server:
-            server.send_message(msg)
+            for to_email, subject, body_text in messages:
+                msg = MIMEMultipart('alternative')
+                msg['Subject'] = subject
+                msg['From'] = sender
+                msg['To'] = to_email
+                msg.attach(MIMEText(body_text, 'plain'))
+                server.send_message(msg)
+                sent += 1
     except Exception as e:
-        current_app.logger.warning(f"Email send failed (local SMTP may be off): {e}")
+        current_app.logger.warning(f"Email send failed after {sent} of {len(messages)} (local SMTP may be off): {e}")
+    return sent
+
+
+def _send_email(to_email: str, subject: str, body_text: str):
+    """Send email via local SMTP."""
+    _send_emails([(to_email, subject, body_text)])
 
 
 def notify_food_request_accepted(donor_email: str, ngo_name: str, food_type: str):
@@ -73,3 +135,42 @@ The delivery of {food_type} has been completed successfully. Please rate each ot
 """
     _send_email(donor_email, subject, body.strip())
     _send_email(ngo_email, subject, body.strip())
+
+
+def _nearby_food_message(ngo_email: str, food_type: str, quantity: int, distance_km: float):
+    """Alert for an NGO that food was posted within its matching radius, as (to, subject, body)."""
+    subject = "SurplusLink: New food available near you"
+    body = f"""
+Hello,
+
+{quantity} portions of {food_type} are available about {distance_km} km from you.
+
+Open your dashboard to accept before someone else does.
+
+- SurplusLink
+"""
+    return ngo_email, subject, body.strip()
+
+
+def send_nearby_post_alerts(post_id: int, matches) -> int:
+    """
+    Alert every matched NGO, resolving emails in chunked queries and sending
+    each chunk over one SMTP connection. Each batch quotes the portions still
+    unclaimed and the run stops early once none are left.
+    Runs on the alert worker; returns the number of alerts sent.
+    """
+    from app.models import FoodPost, User
+
+    batch_size = current_app.config.get('NEARBY_ALERT_BATCH_SIZE', 100)
+    distances = dict(matches)
+    ids = list(distances)
+    sent = 0
+    for i in range(0, len(ids), batch_size):
+        post = FoodPost.query.get(post_id)
+        if post is None or post.is_expired or not post.portions_left:
+            break
+        rows = User.query.with_entities(User.id, User.email).filter(User.id.in_(ids[i:i + batch_size])).all()
+        sent += _send_emails([_nearby_food_message(email, post.food_type, post.portions_left, distances[ngo_id])
+                              for ngo_id, email in rows])
+        db.session.remove()  # the next batch re-reads the post's status
+    return sent
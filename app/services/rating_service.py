@@ -1,34 +1,88 @@
 """Rating and trust score services."""
+from flask import current_app
+from sqlalchemy import func
+
 from app import db
 from app.models import User, Rating, FoodPost
 
 
 
 def create_rating(donor_id: int, ngo_id: int, food_id: int, rater_id: int,
-                  rated_id: int, rating_value: int, feedback: str = None) -> Rating:
-    """Create a rating and update average for the rated user."""
+                  rated_id: int, rating_value: int, feedback: str = None, claim_id: int = None) -> Rating:
+    """Create a rating and update average and trust score for the rated user. The caller commits."""
     rating = Rating(
         donor_id=donor_id,
         ngo_id=ngo_id,
         food_id=food_id,
+        claim_id=claim_id,
         rater_id=rater_id,
         rated_id=rated_id,
         rating_value=min(5, max(1, rating_value)),
         feedback=feedback
     )
     db.session.add(rating)
-    db.session.commit()
-    _update_average_rating(rated_id)
+    _update_average_rating(rated_id, rating.rating_value)
     return rating
 
 
-def _update_average_rating(user_id: int):
-    """Recalculate and update user's average rating."""
-    ratings = Rating.query.filter(Rating.rated_id == user_id).all()
-    if not ratings:
-        return
-    avg = sum(r.rating_value for r in ratings) / len(ratings)
-    user = User.query.get(user_id)
-    if user:
-        user.average_rating = round(avg, 2)
-        db.session.commit()
+def _prior():
+    return (current_app.config.get('TRUST_PRIOR_MEAN', 3.5),
+            current_app.config.get('TRUST_PRIOR_WEIGHT', 5))
+
+
+def bayesian_score(rating_sum: float, rating_count: int) -> float:
+    """Average rating shrunk toward the prior mean; few ratings stay close to the prior."""
+    mean, weight = _prior()
+    return round((weight * mean + rating_sum) / (weight + rating_count), 4)
+
+
+def _update_average_rating(user_id: int, rating_value: int):
+    """Fold one new rating into the user's running counters in a single UPDATE (O(1))."""
+    mean, weight = _prior()
+    new_count = User.rating_count + 1
+    new_sum = User.rating_sum + rating_value
+    User.query.filter(User.id == user_id).update({
+        User.rating_count: new_count,
+        User.rating_sum: new_sum,
+        User.average_rating: func.round(new_sum * 1.0 / new_count, 2),
+        User.trust_score: func.round((weight * mean + new_sum) * 1.0 / (weight + new_count), 4),
+    }, synchronize_session=False)
+
+
+def recompute_trust_scores() -> int:
+    """Rebuild counters, averages and trust scores from the rating table. Returns users updated; the caller commits."""
+    return sum(iter_recompute_trust_scores())
+
+
+def iter_recompute_trust_scores(batch_size: int = 1000):
+    """
+    recompute_trust_scores in user-id batches, yielding the number of users
+    updated after each one so the caller can commit and report progress.
+    """
+    totals = dict(
+        (user_id, (count, total)) for user_id, count, total in
+        db.session.query(Rating.rated_id, func.count(Rating.id), func.sum(Rating.rating_value))
+        .group_by(Rating.rated_id)
+    )
+    last_id = 0
+    while True:
+        users = User.query.filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+        if not users:
+            return
+        for user in users:
+            count, total = totals.get(user.id, (0, 0))
+            user.rating_count = count
+            user.rating_sum = total
+            user.average_rating = round(total / count, 2) if count else 0.0
+            user.trust_score = bayesian_score(total, count) if count else 0.0
+        last_id = users[-1].id
+        db.session.flush()
+        yield len(users)
+
+
+def top_users(role: str, k: int = 5):
+    """Top-k rated users of a role by trust score, served straight from the (role, trust_score) index."""
+    return User.query.filter(
+        User.role == role,
+        User.rating_count > 0
+    ).order_by(User.trust_score.desc(), User.rating_count.desc()).limit(k).all()
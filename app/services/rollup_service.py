@@ -0,0 +1,64 @@
+"""Daily rollups of post activity, aggregated per region shard and summed."""
+from datetime import datetime, time, timedelta
+
+from app import db
+from app.models import Claim, FoodPost
+from app.sharding import fan_out
+
+ROLLUP_FIELDS = ['day', 'posts', 'portions_posted', 'delivered', 'portions_delivered', 'expired']
+
+
+def _window_counts(start: datetime, end: datetime):
+    """{day: {field: n}} for one shard: posts by created day, deliveries by delivered day, expiries by expiry day."""
+    counts = {}
+
+    def add(rows, *fields):
+        for row in rows:
+            day = counts.setdefault(str(row[0]), {})
+            for field, value in zip(fields, row[1:]):
+                day[field] = day.get(field, 0) + (value or 0)
+
+    created = db.func.date(FoodPost.created_at)
+    add(db.session.query(created, db.func.count(FoodPost.id), db.func.sum(FoodPost.quantity)).filter(
+        FoodPost.created_at >= start, FoodPost.created_at < end).group_by(created),
+        'posts', 'portions_posted')
+    delivered = db.func.date(FoodPost.delivered_at)
+    add(db.session.query(delivered, db.func.count(FoodPost.id), db.func.sum(FoodPost.quantity)).filter(
+        FoodPost.status == 'delivered', FoodPost.delivered_at >= start, FoodPost.delivered_at < end
+    ).group_by(delivered), 'delivered', 'portions_delivered')
+    # Claims delivered on posts that never became 'delivered' count as deliveries of their own portions
+    claim_delivered = db.func.date(Claim.delivered_at)
+    add(db.session.query(claim_delivered, db.func.count(Claim.id), db.func.sum(Claim.portions)).join(
+        FoodPost, Claim.food_id == FoodPost.id).filter(
+        Claim.status == 'delivered', FoodPost.status != 'delivered',
+        Claim.delivered_at >= start, Claim.delivered_at < end
+    ).group_by(claim_delivered), 'delivered', 'portions_delivered')
+    expired = db.func.date(FoodPost.expiry_time)
+    add(db.session.query(expired, db.func.count(FoodPost.id)).filter(
+        FoodPost.display_status_is('expired'), FoodPost.expiry_time >= start, FoodPost.expiry_time < end
+    ).group_by(expired), 'expired')
+    return counts
+
+
+def iter_daily_rollups(since, until, days_per_batch: int = 31):
+    """
+    Backfill daily rollups for [since, until] (dates), one window of days at a
+    time. Yields a list of row dicts (ROLLUP_FIELDS) per window; days with no
+    activity are included with zeros.
+    """
+    day = since
+    while day <= until:
+        end = min(day + timedelta(days=days_per_batch - 1), until)
+        start_dt, end_dt = datetime.combine(day, time.min), datetime.combine(end + timedelta(days=1), time.min)
+        merged = {}
+        for shard_counts in fan_out(lambda: _window_counts(start_dt, end_dt)):
+            for key, fields in shard_counts.items():
+                target = merged.setdefault(key, {})
+                for field, value in fields.items():
+                    target[field] = target.get(field, 0) + value
+        rows = []
+        while day <= end:
+            fields = merged.get(day.isoformat(), {})
+            rows.append(dict({f: 0 for f in ROLLUP_FIELDS[1:]}, day=day.isoformat(), **fields))
+            day += timedelta(days=1)
+        yield rows
@@ -0,0 +1,218 @@
+"""Multi-stop pickup routes: nearest neighbour + 2-opt over a cached distance matrix, with expiry deadlines."""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app.services.location_service import haversine_km
+
+MAX_2OPT_PASSES = 20
+
+
+class DistanceMatrixCache:
+    """
+    Bounded LRU of pairwise distance matrices keyed by the exact point list.
+    Re-planning the same stops (page reloads) skips the O(n^2) haversine
+    pass; any change to the stops is simply a new key.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, points):
+        key = tuple(points)
+        with self._lock:
+            matrix = self._entries.get(key)
+            if matrix is not None:
+                self._entries.move_to_end(key)
+                return matrix
+        matrix = _distance_matrix(points)
+        with self._lock:
+            self._entries[key] = matrix
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return matrix
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _distance_matrix(points):
+    n = len(points)
+    matrix = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        lat1, lon1 = points[i]
+        row = matrix[i]
+        for j in range(i + 1, n):
+            d = haversine_km(lat1, lon1, *points[j])
+            row[j] = d
+            matrix[j][i] = d
+    return matrix
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_matrix_cache() -> DistanceMatrixCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DistanceMatrixCache(current_app.config.get('ROUTE_MATRIX_CACHE_SIZE', 256))
+    return _cache
+
+
+def _schedule(order, dist, deadlines, speed_kmh, stop_s):
+    """Seconds-from-departure arrival at each stop along `order`, and total lateness past deadlines."""
+    arrivals = []
+    t = 0.0
+    late = 0.0
+    prev = 0
+    for node in order:
+        t += dist[prev][node] / speed_kmh * 3600
+        arrivals.append(t)
+        deadline = deadlines[node]
+        if deadline is not None and t > deadline:
+            late += t - deadline
+        t += stop_s
+        prev = node
+    return arrivals, late
+
+
+def _nearest_neighbour(dist, deadlines, speed_kmh, stop_s):
+    """Greedy tour from node 0: nearest stop still reachable before its deadline, else the nearest one (it will be late)."""
+    remaining = set(range(1, len(dist)))
+    order = []
+    t = 0.0
+    current = 0
+    while remaining:
+        row = dist[current]
+        reachable = [j for j in remaining
+                     if deadlines[j] is None or t + row[j] / speed_kmh * 3600 <= deadlines[j]]
+        nxt = min(reachable or remaining, key=row.__getitem__)
+        t += row[nxt] / speed_kmh * 3600 + stop_s
+        order.append(nxt)
+        remaining.discard(nxt)
+        current = nxt
+    return order
+
+
+def _repair_lateness(order, dist, deadlines, speed_kmh, stop_s):
+    """
+    Move each late stop to the earlier position that most reduces total
+    lateness. Nearest neighbour ignores urgency beyond "still reachable", so a
+    soon-to-expire pickup can otherwise end up at the back of the route.
+    """
+    arrivals, late = _schedule(order, dist, deadlines, speed_kmh, stop_s)
+    k = 0
+    while late > 0 and k < len(order):
+        deadline = deadlines[order[k]]
+        if deadline is None or arrivals[k] <= deadline:
+            k += 1
+            continue
+        best = None
+        for pos in range(k):
+            candidate = order[:pos] + [order[k]] + order[pos:k] + order[k + 1:]
+            cand_arrivals, cand_late = _schedule(candidate, dist, deadlines, speed_kmh, stop_s)
+            if cand_late < late - 1e-6 and (best is None or cand_late < best[2]):
+                best = (candidate, cand_arrivals, cand_late)
+        if best is not None:
+            order, arrivals, late = best
+        k += 1
+    return order
+
+
+def _two_opt(order, dist, deadlines, speed_kmh, stop_s):
+    """
+    Reverse segments while that shortens the closed tour (depot -> stops ->
+    depot) without adding lateness. The distance delta is O(1), so the O(n)
+    schedule check only runs for moves that would shorten the tour.
+    """
+    tour = [0] + order + [0]
+    _, best_late = _schedule(order, dist, deadlines, speed_kmh, stop_s)
+    n = len(tour)
+    for _ in range(MAX_2OPT_PASSES):
+        improved = False
+        for i in range(1, n - 2):
+            a, b = tour[i - 1], tour[i]
+            dab = dist[a][b]
+            for j in range(i + 1, n - 1):
+                c, d = tour[j], tour[j + 1]
+                delta = dist[a][c] + dist[b][d] - dab - dist[c][d]
+                if delta >= -1e-9:
+                    continue
+                candidate = tour[:i] + tour[i:j + 1][::-1] + tour[j + 1:]
+                _, late = _schedule(candidate[1:-1], dist, deadlines, speed_kmh, stop_s)
+                if late <= best_late + 1e-6:
+                    tour, best_late, improved = candidate, late, True
+                    b = tour[i]
+                    dab = dist[a][b]
+        if not improved:
+            break
+    return tour[1:-1]
+
+
+def plan_route(start, stops, departure: datetime = None, speed_kmh: float = None, stop_minutes: float = None):
+    """
+    Order pickups into one round trip from `start` (lat, lon) and back.
+
+    stops: [(key, lat, lon, deadline datetime or None), ...]. Returns a dict with
+    the ordered stops (key, lat, lon, leg_km, eta, deadline, late), total_km
+    including the return leg, and total_minutes including stop time.
+    """
+    departure = departure or datetime.utcnow()
+    speed_kmh = speed_kmh or current_app.config.get('ROUTE_AVG_SPEED_KMH', 25)
+    stop_s = (current_app.config.get('ROUTE_STOP_MINUTES', 5) if stop_minutes is None else stop_minutes) * 60
+    if not stops:
+        return {'stops': [], 'total_km': 0.0, 'total_minutes': 0, 'late_count': 0}
+
+    points = [(round(start[0], 6), round(start[1], 6))] + [(round(lat, 6), round(lon, 6)) for _, lat, lon, _ in stops]
+    dist = get_matrix_cache().get(points)
+    deadlines = [None] + [(deadline - departure).total_seconds() if deadline is not None else None
+                          for _, _, _, deadline in stops]
+
+    order = _nearest_neighbour(dist, deadlines, speed_kmh, stop_s)
+    order = _repair_lateness(order, dist, deadlines, speed_kmh, stop_s)
+    order = _two_opt(order, dist, deadlines, speed_kmh, stop_s)
+    arrivals, _ = _schedule(order, dist, deadlines, speed_kmh, stop_s)
+
+    planned = []
+    prev = 0
+    for node, arrival in zip(order, arrivals):
+        key, lat, lon, deadline = stops[node - 1]
+        eta = departure + timedelta(seconds=arrival)
+        planned.append({'key': key, 'lat': lat, 'lon': lon, 'leg_km': round(dist[prev][node], 2),
+                        'eta': eta, 'deadline': deadline, 'late': deadline is not None and eta > deadline})
+        prev = node
+    total_km = sum(dist[a][b] for a, b in zip([0] + order, order + [0]))
+    total_s = total_km / speed_kmh * 3600 + stop_s * len(order)
+    return {'stops': planned, 'total_km': round(total_km, 2), 'total_minutes': int(round(total_s / 60)),
+            'late_count': sum(1 for s in planned if s['late'])}
+
+
+def pickup_stops_for_ngo(ngo_id: int):
+    """Open pickups for an NGO: whole posts it accepted and its accepted partial claims, as plan_route stops."""
+    from sqlalchemy.orm import selectinload
+    from app.models import Claim, FoodPost
+
+    stops = []
+    posts = FoodPost.query.options(selectinload(FoodPost.donor)).filter(
+        FoodPost.ngo_id == ngo_id, FoodPost.status == 'accepted'
+    ).all()
+    for post in posts:
+        stops.append(({'post': post, 'claim': None}, post.latitude, post.longitude, post.expiry_time))
+    claims = Claim.query.options(selectinload(Claim.food_post).selectinload(FoodPost.donor)).filter(
+        Claim.ngo_id == ngo_id, Claim.status == 'accepted'
+    ).all()
+    for claim in claims:
+        post = claim.food_post
+        stops.append(({'post': post, 'claim': claim}, post.latitude, post.longitude, post.expiry_time))
+    return stops
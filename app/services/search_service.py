@@ -0,0 +1,147 @@
+"""Full-text search over food posts using an SQLite FTS5 shadow index."""
+import re
+
+from sqlalchemy import column, text
+
+FTS_TABLE = 'food_post_fts'
+
+_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        food_type, address, content='food_post', content_rowid='id', tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS food_post_fts_ai AFTER INSERT ON food_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, food_type, address) VALUES (new.id, new.food_type, new.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS food_post_fts_ad AFTER DELETE ON food_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, food_type, address)
+        VALUES ('delete', old.id, old.food_type, old.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS food_post_fts_au AFTER UPDATE OF food_type, address ON food_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, food_type, address)
+        VALUES ('delete', old.id, old.food_type, old.address);
+        INSERT INTO {FTS_TABLE}(rowid, food_type, address) VALUES (new.id, new.food_type, new.address);
+    END""",
+]
+
+
+def init_search_index(engine) -> bool:
+    """
+    Create the FTS5 table and sync triggers if missing, backfilling existing posts.
+    Triggers keep the index in step with every insert/update, including bulk
+    inserts that bypass the ORM. Returns False when FTS5 is not available.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+        ).first()
+        if exists:
+            return True
+        try:
+            for ddl in _FTS_DDL:
+                conn.execute(text(ddl))
+        except Exception:
+            return False  # SQLite built without FTS5; search falls back to LIKE
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def build_match_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r'\w+', q or '')
+    return ' '.join(f'"{w}"*' for w in words)
+
+
+def fts_available() -> bool:
+    from flask import current_app
+    return current_app.extensions.get('fts5', False)
+
+
+def search_post_ids(q: str, limit: int = None):
+    """Return matching post ids ranked by bm25 relevance (best first)."""
+    from app import db
+
+    match = build_match_query(q)
+    if not match:
+        return []
+    sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match ORDER BY rank"
+    if limit:
+        sql += ' LIMIT :limit'
+    rows = db.session.execute(text(sql), {'match': match, 'limit': limit})
+    return [row[0] for row in rows]
+
+
+def _match_cte(match: str, limit: int = None):
+    """
+    FTS matches as a materialized CTE: SQLite runs the MATCH once and looks the posts up
+    by id, instead of driving from a food_post index and re-running the MATCH per row.
+    With a limit, only the `limit` best by bm25 are kept, ranked among the newest
+    SEARCH_RANK_WINDOW matches, since FTS5 computes bm25 for every row it ranks.
+    """
+    from flask import current_app
+
+    if limit is None:
+        sql = f"SELECT rowid AS id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        return text(sql).bindparams(match=match).columns(column('id')) \
+            .cte('fts').prefix_with('MATERIALIZED')
+    window = current_app.config.get('SEARCH_RANK_WINDOW')
+    sql = f"SELECT rowid AS id, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    params = {'match': match, 'limit': limit}
+    if window:
+        # Cheap rowid-only scan: the id of the window-th newest match is the floor
+        sql += (f" AND rowid >= coalesce((SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+                f" ORDER BY rowid DESC LIMIT 1 OFFSET :offset), 0)")
+        params['offset'] = window - 1
+    sql += ' ORDER BY rank LIMIT :limit'
+    return text(sql).bindparams(**params).columns(column('id'), column('rank')) \
+        .cte('fts').prefix_with('MATERIALIZED')
+
+
+def _like_filter(q: str):
+    from app import db
+    from app.models import FoodPost
+
+    # Escape LIKE wildcards so '%' or '_' in the search text match literally
+    escaped = q.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    like = f'%{escaped}%'
+    return db.or_(FoodPost.food_type.ilike(like, escape='\\'),
+                  FoodPost.address.ilike(like, escape='\\'))
+
+
+def apply_search(query, q: str):
+    """
+    Restrict a FoodPost query to posts matching q, in no particular order, for callers
+    that sort the results themselves. Other filters (status, expiry) on the query are kept.
+    """
+    from app.models import FoodPost
+
+    match = build_match_query(q)
+    if not match:
+        return query
+    if not fts_available():
+        return query.filter(_like_filter(q))
+    fts = _match_cte(match)
+    return query.join(fts, fts.c.id == FoodPost.id)
+
+
+def search_posts(query, q: str, limit: int):
+    """
+    The `limit` posts of a FoodPost query that best match q, most relevant first.
+    Each shard returns its own best `limit`, merged by bm25 rank. Without FTS5 the
+    LIKE fallback lists the newest matches instead.
+    """
+    from app.models import FoodPost
+    from app.sharding import merge_ordered
+
+    match = build_match_query(q)
+    if not match:
+        return []
+    if not fts_available():
+        posts = query.filter(_like_filter(q)).order_by(FoodPost.created_at.desc()).limit(limit).all()
+        return merge_ordered(posts, key=lambda p: p.created_at, reverse=True)[:limit]
+    fts = _match_cte(match, limit)
+    rows = query.join(fts, fts.c.id == FoodPost.id).add_columns(fts.c.rank) \
+        .order_by(fts.c.rank).limit(limit).all()
+    rows = merge_ordered(rows, key=lambda row: row[1])
+    return [post for post, _ in rows[:limit]]
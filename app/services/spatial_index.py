@@ -0,0 +1,109 @@
+"""In-memory grid spatial index for radius queries over lat/lon points."""
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEG_LAT = 111.32
+
+
+def _hav_threshold(radius_km: float) -> float:
+    """Haversine 'a' term for a distance, so comparisons can skip atan2/sqrt."""
+    return math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2) ** 2
+
+
+class GridIndex:
+    """
+    Buckets points into fixed-size lat/lon cells so a radius query only
+    visits the cells overlapping the query circle instead of every point.
+    Each point may carry its own radius for reverse ("who can see me") queries;
+    the reverse search span is the largest radius currently indexed.
+    """
+
+    def __init__(self, cell_deg: float = 0.25):
+        self.cell_deg = cell_deg
+        self._cells = {}    # (row, col) -> {key: (phi, lam, cos_phi, a_max)}
+        self._points = {}   # key -> (row, col)
+        self._radii = {}    # key -> radius_km
+        self._max_radius = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, lat: float, lon: float):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def upsert(self, key, lat: float, lon: float, radius_km: float = 0.0):
+        """Insert or move a point."""
+        with self._lock:
+            self.remove(key)
+            cell = self._cell(lat, lon)
+            phi = math.radians(lat)
+            self._cells.setdefault(cell, {})[key] = (phi, math.radians(lon), math.cos(phi), _hav_threshold(radius_km))
+            self._points[key] = cell
+            self._radii[key] = radius_km
+            if radius_km > self._max_radius:
+                self._max_radius = radius_km
+
+    def remove(self, key):
+        with self._lock:
+            cell = self._points.pop(key, None)
+            if cell is None:
+                return
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self._cells[cell]
+            # Shrink the reverse search span when its widest point leaves
+            if self._radii.pop(key, 0.0) >= self._max_radius:
+                self._max_radius = max(self._radii.values(), default=0.0)
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._points.clear()
+            self._radii.clear()
+            self._max_radius = 0.0
+
+    def _candidate_cells(self, lat: float, lon: float, radius_km: float):
+        dlat = radius_km / KM_PER_DEG_LAT
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        dlon = min(radius_km / (KM_PER_DEG_LAT * cos_lat), 180.0)
+        row0, col0 = self._cell(lat - dlat, lon - dlon)
+        row1, col1 = self._cell(lat + dlat, lon + dlon)
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self._cells):
+            # Wide search over a sparse grid: walk the occupied cells, not every row/col pair
+            for (row, col), bucket in self._cells.items():
+                if row0 <= row <= row1 and col0 <= col <= col1:
+                    yield bucket
+            return
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                bucket = self._cells.get((row, col))
+                if bucket:
+                    yield bucket
+
+    def _scan(self, lat: float, lon: float, search_km: float, a_fixed: float = None):
+        """Haversine 'a' test per candidate; exact distance is only computed for hits."""
+        phi1 = math.radians(lat)
+        lam1 = math.radians(lon)
+        cos1 = math.cos(phi1)
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+        results = []
+        with self._lock:
+            for bucket in self._candidate_cells(lat, lon, search_km):
+                for key, (phi2, lam2, cos2, a_max) in bucket.items():
+                    a = sin((phi2 - phi1) / 2) ** 2 + cos1 * cos2 * sin((lam2 - lam1) / 2) ** 2
+                    if a <= (a_max if a_fixed is None else a_fixed):
+                        results.append((key, 2 * EARTH_RADIUS_KM * asin(sqrt(min(a, 1.0)))))
+        results.sort(key=lambda x: x[1])
+        return results
+
+    def within(self, lat: float, lon: float, radius_km: float):
+        """Return [(key, distance_km), ...] for points within radius_km of (lat, lon), nearest first."""
+        return self._scan(lat, lon, radius_km, a_fixed=_hav_threshold(radius_km))
+
+    def covering(self, lat: float, lon: float):
+        """Reverse query: [(key, distance_km), ...] for points whose own radius reaches (lat, lon)."""
+        return self._scan(lat, lon, self._max_radius)
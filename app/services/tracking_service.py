@@ -0,0 +1,166 @@
+"""Live delivery tracking with fixed-size in-memory breadcrumb buffers."""
+import json
+import threading
+import time
+from array import array
+
+from flask import current_app
+
+from app.sharding import get_router, use_regions
+
+
+class BreadcrumbRing:
+    """
+    Fixed-size ring buffer of (lat, lon, timestamp) points for one delivery.
+    Points are stored in flat float arrays rather than objects or ORM rows,
+    and each point gets a monotonically increasing sequence number so
+    readers can fetch only what they have not seen yet.
+    """
+
+    def __init__(self, size: int, ngo_id: int = None):
+        self.size = size
+        self.ngo_id = ngo_id
+        self.touched = time.monotonic()
+        self._lat = array('d', bytes(8 * size))
+        self._lon = array('d', bytes(8 * size))
+        self._ts = array('d', bytes(8 * size))
+        self._next_seq = 1
+        self._lock = threading.Lock()
+
+    def append(self, lat: float, lon: float, ts: float = None) -> int:
+        """Store a point, overwriting the oldest one when full. Returns its sequence number."""
+        with self._lock:
+            seq = self._next_seq
+            slot = (seq - 1) % self.size
+            self._lat[slot] = lat
+            self._lon[slot] = lon
+            self._ts[slot] = ts if ts is not None else time.time()
+            self._next_seq = seq + 1
+            self.touched = time.monotonic()
+            return seq
+
+    @property
+    def last_seq(self) -> int:
+        return self._next_seq - 1
+
+    def since(self, cursor: int = 0):
+        """Return [(seq, lat, lon, ts), ...] for points newer than cursor still in the buffer."""
+        with self._lock:
+            last = self._next_seq - 1
+            first = max(cursor + 1, last - self.size + 1, 1)
+            points = []
+            for seq in range(first, last + 1):
+                slot = (seq - 1) % self.size
+                points.append((seq, self._lat[slot], self._lon[slot], self._ts[slot]))
+            return points
+
+
+_rings = {}
+_rings_lock = threading.Lock()
+
+
+def _evict_idle(idle_seconds: float):
+    """Drop rings with no position for idle_seconds (abandoned deliveries). Call with _rings_lock held."""
+    cutoff = time.monotonic() - idle_seconds
+    for post_id in [pid for pid, ring in _rings.items() if ring.touched < cutoff]:
+        del _rings[post_id]
+
+
+def record_position(post, ngo_id: int, lat: float, lon: float, ts: float = None):
+    """
+    Append a live position for an active delivery. Only the post's assigned
+    NGO may report, and only while the post is accepted. Returns the point's
+    sequence number, or None if the caller may not track this post or
+    TRACKING_MAX_DELIVERIES deliveries are already being tracked.
+    """
+    if post.status != 'accepted' or post.ngo_id is None or post.ngo_id != ngo_id:
+        return None
+    ring = _rings.get(post.id)
+    if ring is None:
+        config = current_app.config
+        with _rings_lock:
+            ring = _rings.get(post.id)
+            if ring is None:
+                if len(_rings) >= config.get('TRACKING_MAX_DELIVERIES', 2000):
+                    _evict_idle(config.get('TRACKING_IDLE_SECONDS', 3600))
+                    if len(_rings) >= config.get('TRACKING_MAX_DELIVERIES', 2000):
+                        return None
+                ring = BreadcrumbRing(config.get('TRACKING_BUFFER_SIZE', 512), ngo_id)
+                _rings[post.id] = ring
+    if ring.ngo_id != ngo_id:
+        return None
+    return ring.append(lat, lon, ts)
+
+
+def stop_tracking(post_id: int):
+    """Discard a delivery's live trail without persisting it (delivery finished elsewhere or abandoned)."""
+    with _rings_lock:
+        _rings.pop(post_id, None)
+
+
+def get_live_trail(post_id: int, since: int = 0):
+    """Return (points, cursor) for a live delivery, or (None, since) if it is not being tracked."""
+    ring = _rings.get(post_id)
+    if ring is None:
+        return None, since
+    points = ring.since(since)
+    cursor = points[-1][0] if points else max(since, 0)
+    return points, cursor
+
+
+def get_last_position(post_id: int):
+    """Return the most recent (lat, lon) of a live delivery, or None."""
+    ring = _rings.get(post_id)
+    if ring is None:
+        return None
+    points = ring.since(ring.last_seq - 1)
+    return (points[-1][1], points[-1][2]) if points else None
+
+
+def downsample(points, max_points: int):
+    """Keep at most max_points evenly spaced points, always keeping the first and last."""
+    n = len(points)
+    if n <= max_points or max_points < 2:
+        return list(points)
+    step = (n - 1) / (max_points - 1)
+    return [points[round(i * step)] for i in range(max_points)]
+
+
+def finish_tracking(post_id: int):
+    """
+    Stage a delivery's downsampled track for persistence. The live ring is
+    kept until the caller's unit of work commits (register
+    on_commit(stop_tracking, post_id)), so a failed commit loses no points.
+    Returns the DeliveryTrack row, or None if nothing was tracked.
+    """
+    from app.models import DeliveryTrack
+    from app import db
+
+    ring = _rings.get(post_id)
+    if ring is None:
+        return None
+    points = ring.since(0)
+    if not points:
+        return None
+
+    max_points = current_app.config.get('TRACKING_PERSIST_POINTS', 100)
+    kept = downsample(points, max_points)
+    with use_regions([get_router().region_for_post_id(post_id)]):
+        track = DeliveryTrack.query.filter_by(food_id=post_id).first()
+    if track is None:
+        track = DeliveryTrack(food_id=post_id)
+        db.session.add(track)
+    track.points = json.dumps([[round(lat, 6), round(lon, 6), round(ts, 1)] for _, lat, lon, ts in kept])
+    track.point_count = len(kept)
+    return track
+
+
+def get_persisted_trail(post_id: int):
+    """Return the stored track of a completed delivery as [(seq, lat, lon, ts), ...]."""
+    from app.models import DeliveryTrack
+
+    with use_regions([get_router().region_for_post_id(post_id)]):
+        track = DeliveryTrack.query.filter_by(food_id=post_id).first()
+    if track is None or not track.points:
+        return []
+    return [(i + 1, lat, lon, ts) for i, (lat, lon, ts) in enumerate(json.loads(track.points))]
@@ -0,0 +1,221 @@
+"""
+Region sharding for food posts.
+
+Posts, and the claims, delivery tracks and deletion tombstones that go with
+them, live in one SQLite file per configured region (REGION_SHARDS); users,
+ratings and everything else stay in the main database. Each region owns a
+disjoint id range (region index * POST_ID_STRIDE), so the id of any sharded
+row alone identifies its shard. With no regions configured there is a single
+'default' shard and behaviour is identical to an unsharded database.
+
+SQLite cannot commit across files atomically, so every write path touches one
+database: a post and the rows that change with it share a shard, while user
+counters and ratings are written in main. Ratings are the one cross-database
+reference (rating.food_id / claim_id point into a shard); SQLite does not
+enforce those foreign keys, a rating is only written once its post was
+committed as delivered, and archiving only deletes posts that were never
+claimed, so the reference stays valid.
+"""
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.sql.util import find_tables
+
+DEFAULT_REGION = 'default'
+POST_ID_STRIDE = 10 ** 12
+SHARDED_TABLES = frozenset(['food_post', 'claim', 'delivery_track', 'deleted_row'])
+
+_active_regions = ContextVar('active_regions', default=None)
+
+
+class RegionRouter:
+    """Maps coordinates and post ids to region shards. Regions are (name, (min_lat, min_lon, max_lat, max_lon))."""
+
+    def __init__(self, regions):
+        self.regions = [(name, tuple(bbox)) for name, bbox in regions]
+        self.names = [DEFAULT_REGION] + [name for name, _ in self.regions]
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.names) > 1
+
+    def region_for(self, lat: float, lon: float) -> str:
+        for name, (min_lat, min_lon, max_lat, max_lon) in self.regions:
+            if min_lat <= lat < max_lat and min_lon <= lon < max_lon:
+                return name
+        return DEFAULT_REGION
+
+    def regions_near(self, lat: float, lon: float, radius_km: float):
+        """Regions whose box intersects the circle's bounding box, plus the default catch-all."""
+        dlat = radius_km / 111.32
+        dlon = radius_km / (111.32 * max(math.cos(math.radians(lat)), 1e-6))
+        found = [DEFAULT_REGION]
+        for name, (min_lat, min_lon, max_lat, max_lon) in self.regions:
+            if lat - dlat < max_lat and lat + dlat >= min_lat and lon - dlon < max_lon and lon + dlon >= min_lon:
+                found.append(name)
+        return found
+
+    def id_base(self, region: str) -> int:
+        return self._index[region] * POST_ID_STRIDE
+
+    def region_for_post_id(self, post_id: int) -> str:
+        index = int(post_id) // POST_ID_STRIDE
+        return self.names[index] if 0 <= index < len(self.names) else DEFAULT_REGION
+
+
+def bind_key(region: str) -> str:
+    return f'region_{region}'
+
+
+def configure_regions(app):
+    """Build the router and register one SQLAlchemy bind (SQLite file) per region. Call before db.init_app."""
+    router = RegionRouter(app.config.get('REGION_SHARDS') or [])
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    shard_dir = app.config.get('REGION_SHARD_DIR') or app.instance_path
+    for name in router.names[1:]:
+        binds.setdefault(bind_key(name), 'sqlite:///' + os.path.join(shard_dir, f'surplus_link_{name}.db'))
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['region_router'] = router
+    return router
+
+
+def init_region_shards(app):
+    """Create the sharded tables, FTS index and the id ranges in every region shard."""
+    from app import db
+    from app.services.search_service import init_search_index
+
+    router = app.extensions['region_router']
+    tables = [db.metadata.tables[name] for name in sorted(SHARDED_TABLES, reverse=True)]
+    for name in router.names[1:]:
+        engine = db.engines[bind_key(name)]
+        db.metadata.create_all(engine, tables=tables)
+        with engine.begin() as conn:
+            for table in tables:
+                conn.execute(text(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT :table, :base "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :table)"
+                ), {'table': table.name, 'base': router.id_base(name)})
+        init_search_index(engine)
+
+
+def get_router() -> RegionRouter:
+    return current_app.extensions['region_router']
+
+
+@contextmanager
+def use_regions(regions):
+    """Restrict food post queries inside the block to the given region shards."""
+    token = _active_regions.set(list(regions))
+    try:
+        yield
+    finally:
+        _active_regions.reset(token)
+
+
+def fan_out(func, regions=None):
+    """
+    Run func() once per region shard in parallel, each in its own app context
+    and session restricted to that shard. Returns results in region order.
+    """
+    from app import db
+
+    regions = list(regions or get_router().names)
+    app = current_app._get_current_object()
+
+    def run(region):
+        with app.app_context(), use_regions([region]):
+            try:
+                return func()
+            finally:
+                db.session.remove()
+
+    if len(regions) == 1:
+        with use_regions(regions):
+            return [func()]
+    with ThreadPoolExecutor(max_workers=len(regions)) as pool:
+        return list(pool.map(run, regions))
+
+
+def merge_ordered(rows, key, reverse: bool = False):
+    """Restore global order of rows gathered from several shards. No-op with one shard."""
+    if get_router().sharded:
+        rows.sort(key=key, reverse=reverse)
+    return rows
+
+
+def _is_sharded_mapper(mapper) -> bool:
+    return mapper is not None and getattr(mapper, 'local_table', None) is not None \
+        and mapper.local_table.name in SHARDED_TABLES
+
+
+class RegionSession(ShardedSession, FlaskSession):
+    """Flask-SQLAlchemy session that routes food post rows to their region shard."""
+
+    def __init__(self, db, **kwargs):
+        self._router = current_app.extensions['region_router']
+        shards = {DEFAULT_REGION: db.engines[None]}
+        for name in self._router.names[1:]:
+            shards[name] = db.engines[bind_key(name)]
+        super().__init__(
+            shard_chooser=self._choose_shard,
+            identity_chooser=self._choose_identity,
+            execute_chooser=self._choose_execute,
+            shards=shards,
+            db=db,
+            **kwargs
+        )
+
+    def _single_active(self):
+        active = _active_regions.get()
+        return active[0] if active and len(active) == 1 else DEFAULT_REGION
+
+    def _choose_shard(self, mapper, instance=None, clause=None, **kw):
+        if _is_sharded_mapper(mapper):
+            if instance is not None:
+                if getattr(instance, 'latitude', None) is not None and instance.longitude is not None:
+                    return self._router.region_for(instance.latitude, instance.longitude)
+                if getattr(instance, 'food_id', None) is not None:
+                    return self._router.region_for_post_id(instance.food_id)  # claims and tracks follow their post
+            return self._single_active()
+        if mapper is None and clause is not None and _touches_sharded(clause):
+            return self._single_active()
+        return DEFAULT_REGION
+
+    def _choose_identity(self, mapper, primary_key, **kw):
+        if _is_sharded_mapper(mapper):
+            return [self._router.region_for_post_id(primary_key[0])]
+        return [DEFAULT_REGION]
+
+    def _choose_execute(self, orm_context):
+        sharded = any(_is_sharded_mapper(m) for m in orm_context.all_mappers) \
+            or _touches_sharded(orm_context.statement)
+        if not sharded:
+            return [DEFAULT_REGION]
+        return _active_regions.get() or self._router.names
+
+    def _get_impl(self, entity, primary_key_identity, db_load_fn, *, identity_token=None, **kw):
+        # Post, claim and track ids encode their region, so get() goes straight to the owning shard
+        if identity_token is None and _is_sharded_mapper(inspect(entity)):
+            pk = primary_key_identity
+            if isinstance(pk, dict):
+                pk = list(pk.values())
+            elif not isinstance(pk, (list, tuple)):
+                pk = [pk]
+            identity_token = self._router.region_for_post_id(pk[0])
+        return super()._get_impl(entity, primary_key_identity, db_load_fn, identity_token=identity_token, **kw)
+
+
+def _touches_sharded(statement) -> bool:
+    try:
+        tables = find_tables(statement, include_aliases=True, include_joins=True, include_crud=True)
+    except Exception:
+        return False
+    return any(getattr(t, 'name', None) in SHARDED_TABLES for t in tables)
@@ -0,0 +1,86 @@
+"""
+Request-scoped unit of work: one commit per request, side effects after it.
+
+Services and views stage changes on db.session and never commit. The request
+commits once in after_request when the response succeeded (rolls back
+otherwise), and only if something was written, so read-only requests never
+take SQLite's write lock or pay for an fsync. Work that must only happen once
+the data is durable (emails, cache invalidation, in-memory indexes) is
+registered with on_commit() and runs right after that commit; it is dropped if
+the unit of work rolls back.
+
+Scripts and background jobs, which have no request, call commit() themselves.
+"""
+from flask import current_app
+from sqlalchemy import event
+
+from app.sharding import RegionSession
+
+_HOOKS = 'post_commit_hooks'
+_WRITES = 'has_writes'
+
+
+def on_commit(func, *args, **kwargs):
+    """Run func(*args, **kwargs) after the current unit of work commits."""
+    from app import db
+    db.session.info.setdefault(_HOOKS, []).append((func, args, kwargs))
+
+
+def commit():
+    """Commit the current unit of work, then run its post-commit hooks."""
+    from app import db
+    session = db.session()
+    try:
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    _run_hooks(session)
+
+
+def _run_hooks(session):
+    hooks = session.info.pop(_HOOKS, None) or []
+    for func, args, kwargs in hooks:
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            current_app.logger.exception('Post-commit hook %s failed', getattr(func, '__name__', func))
+
+
+@event.listens_for(RegionSession, 'after_flush')
+def _mark_flush(session, flush_context):
+    session.info[_WRITES] = True
+
+
+@event.listens_for(RegionSession, 'do_orm_execute')
+def _mark_dml(orm_execute_state):
+    # Query.update()/delete() and Core inserts bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WRITES] = True
+
+
+@event.listens_for(RegionSession, 'after_commit')
+def _clear_writes(session):
+    session.info.pop(_WRITES, None)
+
+
+@event.listens_for(RegionSession, 'after_soft_rollback')
+def _discard(session, previous_transaction):
+    session.info.pop(_WRITES, None)
+    session.info.pop(_HOOKS, None)
+
+
+def init_unit_of_work(app):
+    """Commit once at the end of every successful request and run the post-commit hooks."""
+    from app import db
+
+    @app.after_request
+    def _finish_unit_of_work(response):
+        session = db.session()
+        if response.status_code >= 400:
+            session.rollback()
+        elif session.info.get(_WRITES) or session.new or session.dirty or session.deleted:
+            commit()
+        else:
+            _run_hooks(session)
+        return response
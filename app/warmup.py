@@ -0,0 +1,63 @@
+"""Boot-time warmup of hot in-memory structures, and readiness tracking."""
+import time
+
+_warmers = []
+
+
+def register_warmer(name: str):
+    """Decorator: run func() inside the app context during warm_up."""
+    def decorator(func):
+        _warmers.append((name, func))
+        return func
+    return decorator
+
+
+def warm_up(app):
+    """
+    Run every registered warmer once. Call before forking workers (gunicorn
+    preload) so children inherit warm structures. Failures are logged, not raised,
+    so a cold cache never stops the server from booting.
+    """
+    state = app.extensions.setdefault('warmup', {'timings_ms': {}, 'errors': {}})
+    started = time.perf_counter()
+    with app.app_context():
+        for name, func in _warmers:
+            t0 = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                state['errors'][name] = str(e)
+                app.logger.warning(f"Warmup step {name} failed: {e}")
+            state['timings_ms'][name] = round((time.perf_counter() - t0) * 1000, 1)
+        from app import db
+        db.session.remove()
+    state['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    app.logger.info(f"Warmup finished in {state['total_ms']} ms")
+    return state
+
+
+def is_ready(app) -> bool:
+    """True once warm_up() has finished in this process (or the master it was forked from)."""
+    return app.extensions.get('warmup', {}).get('total_ms') is not None
+
+
+@register_warmer('orm_mappers')
+def _configure_mappers():
+    from sqlalchemy.orm import configure_mappers
+    import app.models  # noqa: F401
+    configure_mappers()
+
+
+@register_warmer('templates')
+def _compile_templates():
+    from flask import current_app
+    env = current_app.jinja_env
+    for name in env.list_templates(extensions=['html']):
+        env.get_template(name)
+
+
+@register_warmer('ngo_spatial_index')
+def _build_ngo_index():
+    from app.services.location_service import get_ngo_index, reset_ngo_index
+    reset_ngo_index()
+    get_ngo_index()
@@ -0,0 +1,103 @@
+"""
+Benchmark: many NGOs claiming portions of one hot post at the same time.
+
+Every worker thread keeps claiming a few portions until the post runs out.
+Afterwards the claims must add up to exactly the post's quantity: no
+over-allocation, no lost portions.
+
+    python -m benchmarks.bench_claim_contention --workers 16 --portions 500
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_bench_app, seed_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--portions', type=int, default=500)
+    parser.add_argument('--max-claim', type=int, default=5, help='Each claim takes 1..max-claim portions')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_bench_app()
+    with app.app_context():
+        from app import db
+        from app.models import FoodPost, User
+        rng = random.Random(args.seed)
+        seed_users('donor', 1, rng)
+        seed_users('ngo', args.workers, rng)
+        donor_id = User.query.filter_by(role='donor').first().id
+        ngo_ids = [u.id for u in User.query.filter_by(role='ngo').with_entities(User.id)]
+        post = FoodPost(donor_id=donor_id, food_type='catered meals', quantity=args.portions,
+                        remaining_quantity=args.portions, expiry_time=datetime.utcnow() + timedelta(hours=4),
+                        latitude=12.97, longitude=77.59)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    stats = {'won': 0, 'lost': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(i):
+        from app import db
+        from app.services.claim_service import claim_portions
+        from app.unit_of_work import commit
+        rng = random.Random(args.seed + i)
+        won = lost = errors = 0
+        with app.app_context():
+            while True:
+                try:
+                    claim = claim_portions(post_id, ngo_ids[i], rng.randint(1, args.max_claim))
+                    if claim is not None:
+                        commit()
+                except Exception:
+                    db.session.rollback()
+                    errors += 1
+                    continue
+                if claim is not None:
+                    won += 1
+                    continue
+                db.session.rollback()
+                lost += 1
+                remaining = db.session.get(FoodPost, post_id)
+                db.session.refresh(remaining)
+                if remaining.portions_left == 0:
+                    break
+            db.session.remove()
+        with lock:
+            stats['won'] += won
+            stats['lost'] += lost
+            stats['errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.workers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with app.app_context():
+        from app import db
+        from app.models import Claim, FoodPost
+        from sqlalchemy import func
+        post = db.session.get(FoodPost, post_id)
+        claimed, count = db.session.query(func.coalesce(func.sum(Claim.portions), 0), func.count(Claim.id)) \
+            .filter(Claim.food_id == post_id).one()
+
+    print(f'{args.workers} workers, {args.portions} portions: {count} claims in {elapsed:.2f} s '
+          f'-> {count / elapsed:,.0f} claims/s')
+    print(f'rejected attempts={stats["lost"]} errors={stats["errors"]}')
+    print(f'claimed={claimed} remaining={post.remaining_quantity} status={post.status}')
+    ok = claimed == args.portions and post.remaining_quantity == 0 and count == stats['won']
+    print('OK: no over-allocation' if ok else 'FAIL: claims do not match the post quantity')
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: dashboard render time with and without the fragment cache on 1k-row pages.
+
+One donor owns --posts available posts near one NGO. For the donor dashboard,
+NGO dashboard and admin posts list, reports median request time and the time
+spent in template rendering alone, with the cache off, cold, warm, and warm
+after --changes posts changed state.
+
+    python -m benchmarks.bench_fragment_cache --posts 1000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from flask import template_rendered
+
+from benchmarks.common import CENTER_LAT, CENTER_LON, login, make_bench_app, seed_users
+
+PAGES = [('donor', '/donor/dashboard'), ('ngo', '/ngo/dashboard'), ('admin', '/admin/posts')]
+
+
+class RenderTimer:
+    """Time spent rendering the page templates, from before_render_template to template_rendered."""
+
+    def __init__(self, app):
+        from flask import before_render_template
+        self.total = 0.0
+        self._depth = 0
+        self._start = 0.0
+        before_render_template.connect(self._before, app)
+        template_rendered.connect(self._after, app)
+
+    def _before(self, sender, **kw):
+        if self._depth == 0:
+            self._start = time.perf_counter()
+        self._depth += 1
+
+    def _after(self, sender, **kw):
+        self._depth -= 1
+        if self._depth == 0:
+            self.total += time.perf_counter() - self._start
+
+
+def measure(client, timer, path, repeat):
+    requests, renders = [], []
+    for _ in range(repeat):
+        timer.total = 0.0
+        t0 = time.perf_counter()
+        resp = client.get(path)
+        requests.append(time.perf_counter() - t0)
+        renders.append(timer.total)
+        assert resp.status_code == 200, (path, resp.status_code)
+    return statistics.median(requests) * 1000, statistics.median(renders) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--changes', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = make_bench_app()
+    with app.app_context():
+        from datetime import datetime, timedelta
+        from app import db
+        from app.models import FoodPost, User
+        seed_users('donor', 1, rng)
+        seed_users('ngo', 1, rng)
+        seed_users('admin', 1, rng)
+        donor_id = User.query.filter_by(role='donor').first().id
+        User.query.filter_by(role='ngo').update(
+            {User.latitude: CENTER_LAT, User.longitude: CENTER_LON, User.match_radius_km: 100})
+        now = datetime.utcnow()
+        db.session.execute(FoodPost.__table__.insert(), [{
+            'donor_id': donor_id, 'food_type': rng.choice(['rice', 'dal', 'bread']), 'quantity': 50,
+            'remaining_quantity': 50, 'expiry_time': now + timedelta(hours=6), 'status': 'available',
+            'delivery_type': 'pickup', 'latitude': CENTER_LAT + rng.uniform(-0.2, 0.2),
+            'longitude': CENTER_LON + rng.uniform(-0.2, 0.2), 'created_at': now, 'updated_at': now,
+        } for _ in range(args.posts)])
+        db.session.commit()
+        post_ids = [p.id for p in FoodPost.query.with_entities(FoodPost.id)]
+
+    timer = RenderTimer(app)
+    clients = {}
+    for role, _ in PAGES:
+        clients[role] = app.test_client()
+        login(clients[role], f'{role}0@bench.local')
+
+    print(f'{args.posts} posts, median of {args.repeat} requests (request ms / render ms)')
+    print(f'{"page":<28}{"no cache":>16}{"cold":>16}{"warm":>16}{"after changes":>16}')
+    for role, path in PAGES:
+        client = clients[role]
+        app.config['FRAGMENT_CACHE_ENABLED'] = False
+        off = measure(client, timer, path, args.repeat)
+        app.config['FRAGMENT_CACHE_ENABLED'] = True
+        with app.app_context():
+            from app.services.fragment_cache import get_fragment_cache
+            get_fragment_cache().clear()
+        cold = measure(client, timer, path, 1)
+        warm = measure(client, timer, path, args.repeat)
+        with app.app_context():
+            from app import db
+            from app.models import FoodPost
+            changed = rng.sample(post_ids, args.changes)
+            FoodPost.query.filter(FoodPost.id.in_(changed)).update(
+                {FoodPost.quantity: FoodPost.quantity + 1}, synchronize_session=False)
+            db.session.commit()
+        changed = measure(client, timer, path, 1)
+        cells = ''.join(f'{r:>8.1f}/{t:<7.1f}' for r, t in (off, cold, warm, changed))
+        print(f'{path:<28}{cells}')
+    with app.app_context():
+        from app.services.fragment_cache import get_fragment_cache
+        cache = get_fragment_cache()
+        print(f'cache: {len(cache)} entries, {cache.hits} hits, {cache.misses} misses')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: map cluster payload and latency vs. shipping every marker.
+
+Seeds --posts available posts over the metro box and requests a 1280x768 px
+viewport centred on it at several zoom levels: cold (tiles computed) and
+warm (cached).
+
+    python -m benchmarks.bench_map_clusters --posts 20000
+"""
+import argparse
+import json
+import math
+import random
+import time
+
+from benchmarks.common import CENTER_LAT, CENTER_LON, make_bench_app, seed_posts, seed_users
+
+
+def viewport(zoom: int, width_px: int = 1280, height_px: int = 768):
+    """Lat/lon box a browser map of the given pixel size shows at this zoom."""
+    deg_per_px = 360.0 / (256 * 2 ** zoom)
+    dlon = width_px / 2 * deg_per_px
+    dlat = height_px / 2 * deg_per_px * math.cos(math.radians(CENTER_LAT))
+    return CENTER_LAT - dlat, CENTER_LON - dlon, CENTER_LAT + dlat, CENTER_LON + dlon
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = make_bench_app()
+    with app.app_context():
+        from app import db
+        from app.models import FoodPost, User
+        from app.services.cluster_service import get_cluster_cache, get_clusters
+        seed_users('donor', 100, rng)
+        seed_posts([u.id for u in User.query.with_entities(User.id)], args.posts, rng)
+
+        t0 = time.perf_counter()
+        markers = db.session.query(FoodPost.id, FoodPost.latitude, FoodPost.longitude, FoodPost.quantity).filter(
+            FoodPost.status == 'available').all()
+        raw_ms = (time.perf_counter() - t0) * 1000
+        raw_bytes = len(json.dumps([list(m) for m in markers]))
+        print(f'every marker: {len(markers):>6} points {raw_bytes / 1024:>8.1f} KiB {raw_ms:>8.1f} ms')
+
+        print(f'{"zoom":>4}{"tiles":>7}{"clusters":>10}{"KiB":>8}{"cold ms":>10}{"warm ms":>10}')
+        for zoom in (8, 10, 12, 14, 16):
+            bbox = viewport(zoom)
+            get_cluster_cache().clear()
+            t0 = time.perf_counter()
+            clusters, tiles = get_clusters(*bbox, zoom=zoom)
+            cold = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            get_clusters(*bbox, zoom=zoom)
+            warm = (time.perf_counter() - t0) * 1000
+            size = len(json.dumps(clusters)) / 1024
+            print(f'{zoom:>4}{tiles:>7}{len(clusters):>10}{size:>8.1f}{cold:>10.1f}{warm:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
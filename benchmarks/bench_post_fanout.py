@@ -0,0 +1,133 @@
+"""
+Benchmark: posts created per second including the reverse NGO fan-out, and
+the new-post alert emails it produces.
+
+Alerts are on and go to an in-process SMTP sink on a free local port, so
+every message is really sent. After the posts are created the bench reports
+how long the alert worker takes to drain, and how long one "food accepted"
+email queued behind that backlog takes to arrive.
+
+    python -m benchmarks.bench_post_fanout --ngos 20000 --posts 500
+"""
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+from benchmarks.common import make_bench_app, seed_users, random_point, login
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server that accepts and counts messages, remembering when each recipient's mail arrived."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.count = 0
+        self.connections = 0
+        self.arrivals = {}
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        self.reply('220 sink ready')
+        rcpt = []
+        for raw in self.rfile:
+            cmd = raw.decode(errors='replace').strip().upper()
+            if cmd.startswith('EHLO') or cmd.startswith('HELO'):
+                self.reply('250 sink')
+            elif cmd.startswith('RCPT'):
+                rcpt.append(cmd.split(':', 1)[1].strip(' <>').lower())
+                self.reply('250 ok')
+            elif cmd == 'DATA':
+                self.reply('354 end with .')
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                now = time.perf_counter()
+                with sink.lock:
+                    sink.count += 1
+                    for addr in rcpt:
+                        sink.arrivals[addr] = now
+                rcpt = []
+                self.reply('250 queued')
+            elif cmd == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:  # MAIL, RSET, NOOP
+                self.reply('250 ok')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ngos', type=int, default=20000)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sink = SMTPSink()
+    app = make_bench_app(NEARBY_ALERTS_ENABLED=True, MAIL_SERVER='127.0.0.1', MAIL_PORT=sink.port)
+    with app.app_context():
+        from app.services.location_service import get_ngo_index, find_ngos_for_post, reset_ngo_index
+
+        seed_users('ngo', args.ngos, rng)
+        donor_email = seed_users('donor', 1, rng)[0]
+
+        reset_ngo_index()
+        t0 = time.perf_counter()
+        index = get_ngo_index()
+        print(f'index build: {len(index)} NGOs in {(time.perf_counter() - t0) * 1000:.1f} ms')
+
+        points = [random_point(rng) for _ in range(args.posts)]
+        t0 = time.perf_counter()
+        matched = sum(len(find_ngos_for_post(lat, lon)) for lat, lon in points)
+        elapsed = time.perf_counter() - t0
+        print(f'fan-out only: {args.posts / elapsed:,.0f} queries/s, '
+              f'{matched / args.posts:,.0f} NGOs matched per post on average')
+
+    client = app.test_client()
+    login(client, donor_email)
+    t0 = time.perf_counter()
+    for lat, lon in points:
+        resp = client.post('/donor/post/create', data={
+            'food_type': 'rice', 'quantity': 50, 'expiry_hours': 4,
+            'delivery_type': 'pickup', 'latitude': lat, 'longitude': lon,
+        })
+        assert resp.status_code == 302, resp.status_code
+    created = time.perf_counter()
+    elapsed = created - t0
+    print(f'create_post incl. fan-out: {args.posts / elapsed:,.0f} posts/s '
+          f'({elapsed / args.posts * 1000:.2f} ms/post)')
+
+    # A transactional email queued while the alert backlog is still draining
+    from app.services import notification_service as ns
+    with app.app_context():
+        queued = time.perf_counter()
+        ns.enqueue_notification(ns.notify_food_request_accepted, 'donor-check@bench.local', 'NGO', 'rice')
+    ns._outbox.queue.join()
+    accepted_ms = (sink.arrivals['donor-check@bench.local'] - queued) * 1000
+    ns._alert_outbox.queue.join()
+    drained = time.perf_counter() - t0
+    alerts = sink.count - 1
+    print(f'alerts: {alerts:,} sent over {sink.connections - 1:,} SMTP connections, '
+          f'{alerts / drained:,.0f}/s, queue drained {drained - elapsed:.1f} s after the last post')
+    print(f'"accepted" email behind the alert backlog: delivered in {accepted_ms:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: post write throughput with 1 shard vs. N region shards.
+
+Each writer thread creates posts (one commit each) inside its own region,
+so with sharding every region contends only for its own SQLite write lock.
+
+    python -m benchmarks.bench_region_writes --regions 4 --writers 8 --posts 400
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_bench_app, seed_users
+
+
+def region_boxes(count: int):
+    """count side-by-side 1x1 degree boxes."""
+    return [(f'r{i}', (10.0, 70.0 + i, 11.0, 71.0 + i)) for i in range(count)]
+
+
+def run(regions: int, writers: int, posts: int, seed: int):
+    shard_dir = tempfile.mkdtemp(prefix='surplus-shards-')
+    boxes = region_boxes(max(regions, 1))
+    app = make_bench_app(REGION_SHARDS=boxes if regions > 1 else [], REGION_SHARD_DIR=shard_dir,
+                         SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(shard_dir, 'main.db'))
+    with app.app_context():
+        from app.models import User
+        seed_users('donor', 1, random.Random(seed))
+        donor_id = User.query.first().id
+
+    def writer(i):
+        from app import db
+        from app.models import FoodPost
+        rng = random.Random(seed + i)
+        _, (min_lat, min_lon, _, _) = boxes[i % len(boxes)]
+        with app.app_context():
+            for _ in range(posts // writers):
+                db.session.add(FoodPost(
+                    donor_id=donor_id, food_type='rice', quantity=10,
+                    expiry_time=datetime.utcnow() + timedelta(hours=4),
+                    latitude=min_lat + rng.random() * 0.9, longitude=min_lon + rng.random() * 0.9,
+                ))
+                db.session.commit()
+            db.session.remove()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    total = posts // writers * writers
+    print(f'{max(regions, 1)} shard(s), {writers} writers: {total / elapsed:,.0f} posts/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--regions', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--posts', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(1, args.writers, args.posts, args.seed)
+    run(args.regions, args.writers, args.posts, args.seed)
+
+
+if __name__ == '__main__':
+    main()
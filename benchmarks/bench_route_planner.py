@@ -0,0 +1,76 @@
+"""
+Benchmark: pickup route planning time and quality for N stops.
+
+Random pickups within --radius km of the NGO (its match radius) with expiry
+deadlines 2-12 hours out, planned as one round trip from the NGO. Reports
+planning time with a cold and a warm distance matrix, and the tour length of
+plain nearest neighbour vs. the full planner (NN, lateness repair, 2-opt).
+The target is under 50 ms for 50 stops.
+
+    python -m benchmarks.bench_route_planner --stops 50 --repeat 50
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import CENTER_LAT, CENTER_LON, make_bench_app
+
+
+def random_stops(rng, n, now, radius_km):
+    dlat = radius_km / 111.32
+    dlon = dlat / math.cos(math.radians(CENTER_LAT))
+    stops = []
+    for i in range(n):
+        lat, lon = CENTER_LAT + rng.uniform(-dlat, dlat), CENTER_LON + rng.uniform(-dlon, dlon)
+        stops.append((i, lat, lon, now + timedelta(minutes=rng.randint(120, 720))))
+    return stops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stops', type=int, nargs='+', default=[10, 25, 50, 100])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--radius', type=float, default=15, help='Stops lie within this many km of the NGO')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_bench_app()
+    with app.app_context():
+        from app.services import route_service
+        speed = app.config['ROUTE_AVG_SPEED_KMH']
+        stop_s = app.config['ROUTE_STOP_MINUTES'] * 60
+        print(f'{"stops":>6}{"cold p50 ms":>13}{"cold max ms":>13}{"warm p50 ms":>13}'
+              f'{"NN km":>9}{"planned km":>12}{"late":>6}')
+        for n in args.stops:
+            rng = random.Random(args.seed)
+            now = datetime.utcnow()
+            cold, warm, nn_km, opt_km, late = [], [], [], [], []
+            for _ in range(args.repeat):
+                stops = random_stops(rng, n, now, args.radius)
+                route_service.get_matrix_cache().clear()
+                t0 = time.perf_counter()
+                route = route_service.plan_route((CENTER_LAT, CENTER_LON), stops, departure=now)
+                cold.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                route_service.plan_route((CENTER_LAT, CENTER_LON), stops, departure=now)
+                warm.append(time.perf_counter() - t0)
+
+                # Plain nearest neighbour on the same matrix, for comparison
+                points = [(round(CENTER_LAT, 6), round(CENTER_LON, 6))] + \
+                    [(round(lat, 6), round(lon, 6)) for _, lat, lon, _ in stops]
+                dist = route_service.get_matrix_cache().get(points)
+                deadlines = [None] + [(d - now).total_seconds() for *_, d in stops]
+                order = route_service._nearest_neighbour(dist, deadlines, speed, stop_s)
+                nn_km.append(sum(dist[a][b] for a, b in zip([0] + order, order + [0])))
+                opt_km.append(route['total_km'])
+                late.append(route['late_count'])
+            print(f'{n:>6}{statistics.median(cold) * 1000:>13.2f}{max(cold) * 1000:>13.2f}'
+                  f'{statistics.median(warm) * 1000:>13.2f}{statistics.mean(nn_km):>9.1f}'
+                  f'{statistics.mean(opt_km):>12.1f}{statistics.mean(late):>6.1f}')
+
+
+if __name__ == '__main__':
+    main()
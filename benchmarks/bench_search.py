@@ -0,0 +1,56 @@
+"""
+Benchmark: FTS5 post search vs. a LIKE '%term%' scan. 'ranked' is the admin search
+(best 50 by relevance); 'fts5' is the unordered match used by the nearby-posts search.
+
+    python -m benchmarks.bench_search --posts 1000000
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import make_bench_app, seed_posts, seed_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = make_bench_app()
+    with app.app_context():
+        from app import db
+        from app.models import FoodPost, User
+        from app.services.search_service import apply_search, search_posts
+
+        seed_users('donor', 100, rng)
+        donor_ids = [u.id for u in User.query.with_entities(User.id)]
+        t0 = time.perf_counter()
+        for start in range(0, args.posts, 50000):
+            seed_posts(donor_ids, min(50000, args.posts - start), rng)
+        print(f'seeded {args.posts} posts (FTS maintained by triggers) in {time.perf_counter() - t0:.1f} s')
+
+        # A rare dish (1 in 5000 posts) next to the very common ones seeded above
+        db.session.execute(text("UPDATE food_post SET food_type = 'paneer tikka' WHERE id % 5000 = 0"))
+        db.session.commit()
+
+        for term in ['pan', 'paneer', 'ric', 'rice']:
+            for label, run in [
+                ('ranked', lambda q: search_posts(FoodPost.query.filter(FoodPost.status == 'available'), q, 50)),
+                ('fts5', lambda q: apply_search(FoodPost.query.filter(FoodPost.status == 'available'), q).limit(50).all()),
+                ('like', lambda q: FoodPost.query.filter(
+                    FoodPost.status == 'available', FoodPost.food_type.ilike(f'%{q}%')).limit(50).all()),
+            ]:
+                t0 = time.perf_counter()
+                for _ in range(args.queries):
+                    hits = len(run(term))
+                    db.session.expunge_all()
+                elapsed = time.perf_counter() - t0
+                print(f'{term!r:<10}{label:<7}: {elapsed / args.queries * 1000:8.2f} ms/query ({hits} hits, top 50)')
+
+if __name__ == '__main__':
+    main()
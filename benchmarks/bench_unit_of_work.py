@@ -0,0 +1,110 @@
+"""
+Benchmark: database commits per request and write throughput per flow.
+
+Drives the donor/NGO write paths (create, accept, claim, complete, rate) and
+the two dashboards through the test client, counting every DBAPI COMMIT the
+engines issue while each request runs.
+
+    python -m benchmarks.bench_unit_of_work --requests 200
+"""
+import argparse
+import logging
+import random
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmarks.common import CENTER_LAT, CENTER_LON, login, make_bench_app, seed_posts, seed_users
+
+
+class CommitCounter:
+    """Counts COMMITs on every engine (the main database and any region shards)."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'commit', self._on_commit)
+
+    def _on_commit(self, conn):
+        self.count += 1
+
+
+def run_flow(app, counter, name, requests, check=None):
+    """
+    requests: list of zero-arg callables, each issuing one HTTP request.
+    check: optional (query, expected) run afterwards, so a flow that silently
+    failed (error flash + redirect) or never committed is caught.
+    """
+    counter.count = 0
+    t0 = time.perf_counter()
+    for send in requests:
+        resp = send()
+        assert resp.status_code < 400, (name, resp.status_code)
+    elapsed = time.perf_counter() - t0
+    n = len(requests)
+    if check is not None:
+        with app.app_context():
+            query, expected = check
+            assert query() == expected, (name, query(), expected)
+    print(f'{name:<22}{n:>6}{counter.count / n:>12.2f}{n / elapsed:>12.0f}{elapsed / n * 1000:>10.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per write flow')
+    parser.add_argument('--reads', type=int, default=20, help='Requests per dashboard')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Nothing listens on the mail port; notifications fail fast either way
+    app = make_bench_app(MAIL_PORT=9)
+    app.logger.setLevel(logging.ERROR)
+    n = args.requests
+    with app.app_context():
+        from app import db
+        from app.models import Claim, FoodPost, Rating, User
+        seed_users('donor', 1, rng)
+        seed_users('ngo', 1, rng)
+        donor_id = User.query.filter_by(role='donor').first().id
+        User.query.filter_by(role='ngo').update({User.latitude: CENTER_LAT, User.longitude: CENTER_LON})
+        db.session.commit()
+        seed_posts([donor_id], n + 1, rng)
+        post_ids = sorted(p.id for p in FoodPost.query.with_entities(FoodPost.id))
+        hot_id, post_ids = post_ids[0], post_ids[1:]
+        for post_id in post_ids:
+            FoodPost.query.filter_by(id=post_id).update({FoodPost.delivery_type: 'pickup'})
+        FoodPost.query.filter_by(id=hot_id).update({FoodPost.quantity: n, FoodPost.remaining_quantity: n})
+        db.session.commit()
+
+    donor, ngo = app.test_client(), app.test_client()
+    login(donor, 'donor0@bench.local')
+    login(ngo, 'ngo0@bench.local')
+    counter = CommitCounter()
+
+    def count(model, **filters):
+        return lambda: model.query.filter_by(**filters).count()
+
+    print(f'{"flow":<22}{"reqs":>6}{"commits/req":>12}{"req/s":>12}{"ms/req":>10}')
+    run_flow(app, counter, 'create post', [
+        lambda: donor.post('/donor/post/create', data={
+            'food_type': 'rice', 'quantity': 10, 'latitude': CENTER_LAT, 'longitude': CENTER_LON})
+        for _ in range(n)], check=(count(FoodPost), 2 * n + 1))
+    run_flow(app, counter, 'accept post', [
+        (lambda pid=pid: ngo.post(f'/ngo/post/{pid}/accept')) for pid in post_ids],
+        check=(count(FoodPost, status='accepted'), n))
+    run_flow(app, counter, 'complete pickup', [
+        (lambda pid=pid: ngo.post(f'/ngo/api/post/{pid}/complete-pickup')) for pid in post_ids],
+        check=(count(FoodPost, status='delivered'), n))
+    run_flow(app, counter, 'rate donor', [
+        (lambda pid=pid: ngo.post(f'/ngo/post/{pid}/rate', data={'rating': 4})) for pid in post_ids],
+        check=(count(Rating), n))
+    run_flow(app, counter, 'claim portions', [
+        lambda: ngo.post(f'/ngo/post/{hot_id}/claim', data={'portions': 1}) for _ in range(n)],
+        check=(count(Claim), n))
+    run_flow(app, counter, 'ngo dashboard', [lambda: ngo.get('/ngo/dashboard') for _ in range(args.reads)])
+    run_flow(app, counter, 'donor dashboard', [lambda: donor.get('/donor/dashboard') for _ in range(args.reads)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: bulk user import (validate, dedupe, parallel hash, chunked insert).
+
+Generates a partner list with a few in-file duplicates, already-registered
+emails and invalid rows, imports it, and reports rows/s. Password hashing
+dominates, so throughput scales with --workers (CPU cores).
+
+    python -m benchmarks.bench_user_import --rows 10000 --workers 8
+"""
+import argparse
+import io
+import json
+import os
+import random
+import time
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks.common import make_bench_app, random_point, seed_users
+
+
+def make_records(rows: int, rng: random.Random):
+    lines = []
+    for i in range(rows):
+        lat, lon = random_point(rng)
+        record = {'name': f'Partner {i}', 'email': f'partner{i}@import.local', 'role': rng.choice(['donor', 'ngo']),
+                  'password': f'pw-{i}', 'latitude': round(lat, 5), 'longitude': round(lon, 5)}
+        if i % 100 == 1:
+            record['email'] = f'partner{i - 1}@import.local'  # duplicate within the file
+        elif i % 100 == 2:
+            record['email'] = 'ngo0@bench.local'  # already registered
+        elif i % 100 == 3:
+            record['email'] = 'not-an-email'
+        lines.append(json.dumps(record))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = make_bench_app()
+    payload = make_records(args.rows, rng)
+
+    t0 = time.perf_counter()
+    for _ in range(5):
+        generate_password_hash('x')
+    hash_ms = (time.perf_counter() - t0) / 5 * 1000
+
+    with app.app_context():
+        from app.services.import_service import import_users, read_rows
+        seed_users('ngo', 1, rng)
+        counts = {}
+        first_created = None
+        t0 = time.perf_counter()
+        for result in import_users(read_rows(io.StringIO(payload), 'jsonl'),
+                                   chunk_size=args.chunk_size, workers=args.workers):
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+            if result['status'] == 'created' and first_created is None:
+                first_created = time.perf_counter() - t0
+        elapsed = time.perf_counter() - t0
+
+    print(f'{args.rows} rows, {args.workers} hash workers, chunk {args.chunk_size}: {elapsed:.2f} s '
+          f'-> {args.rows / elapsed:,.0f} rows/s')
+    print(f'first created row reported after {first_created or 0:.2f} s')
+    print('results: ' + ', '.join(f'{k}={v}' for k, v in sorted(counts.items())))
+    print(f'one password hash: {hash_ms:.0f} ms; serial hashing alone would take '
+          f'{hash_ms * counts.get("created", 0) / 1000:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
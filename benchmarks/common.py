@@ -0,0 +1,84 @@
+"""Shared setup for benchmarks: throwaway app on a temporary SQLite file, bulk seeding."""
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from config import Config
+
+BENCH_PASSWORD = 'bench-pass'
+
+# Bangalore-sized metro box used for seeding
+CENTER_LAT, CENTER_LON = 12.97, 77.59
+SPREAD_DEG = 0.35
+
+
+def make_bench_app(**overrides):
+    """Create the app against a fresh SQLite file in a temp dir."""
+    from app import create_app
+
+    attrs = {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='surplus-bench-'), 'bench.db'),
+        'NEARBY_ALERTS_ENABLED': False,
+    }
+    attrs.update(overrides)
+    return create_app(type('BenchConfig', (Config,), attrs))
+
+
+def random_point(rng: random.Random):
+    return (CENTER_LAT + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+            CENTER_LON + rng.uniform(-SPREAD_DEG, SPREAD_DEG))
+
+
+def seed_users(role: str, count: int, rng: random.Random, prefix: str = None):
+    """Bulk insert users sharing one precomputed password hash. Returns their emails."""
+    from app import db
+    from app.models import User
+
+    prefix = prefix or role
+    pw_hash = generate_password_hash(BENCH_PASSWORD)
+    rows = []
+    for i in range(count):
+        lat, lon = random_point(rng)
+        rows.append({
+            'name': f'{prefix} {i}', 'email': f'{prefix}{i}@bench.local', 'password_hash': pw_hash,
+            'role': role, 'latitude': lat, 'longitude': lon, 'average_rating': 0.0,
+            'created_at': datetime.utcnow(),
+        })
+    db.session.execute(User.__table__.insert(), rows)
+    db.session.commit()
+    return [r['email'] for r in rows]
+
+
+def seed_posts(donor_ids, count: int, rng: random.Random, status: str = 'available'):
+    """Bulk insert available food posts spread over the metro box."""
+    from app import db
+    from app.models import FoodPost
+
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        lat, lon = random_point(rng)
+        rows.append({
+            'donor_id': rng.choice(donor_ids), 'food_type': rng.choice(['rice', 'dal', 'bread', 'curry', 'biryani']),
+            'quantity': rng.randint(5, 200), 'expiry_time': now + timedelta(hours=rng.randint(2, 12)),
+            'status': status, 'delivery_type': rng.choice(['pickup', 'delivery']),
+            'latitude': lat, 'longitude': lon, 'created_at': now,
+        })
+    # Core inserts, grouped by the region shard that owns each post
+    from app.sharding import get_router, use_regions
+    router = get_router()
+    by_region = {}
+    for row in rows:
+        by_region.setdefault(router.region_for(row['latitude'], row['longitude']), []).append(row)
+    for region, region_rows in by_region.items():
+        with use_regions([region]):
+            db.session.execute(FoodPost.__table__.insert(), region_rows)
+    db.session.commit()
+
+
+def login(client, email: str, password: str = BENCH_PASSWORD):
+    return client.post('/auth/login', data={'email': email, 'password': password})
@@ -0,0 +1,278 @@
+"""
+End-to-end load test: replays a weighted mix of user traffic against create_app
+and reports throughput and p50/p95/p99 latency per endpoint.
+
+    python -m benchmarks.loadtest --concurrency 8 --requests 5000
+    python -m benchmarks.loadtest --mode wsgi --mix nearby=50,status=30,create_post=20
+
+The database is freshly seeded from --seed on every run, so runs are repeatable.
+A request counts as an error unless it returns its scenario's expected status
+(and, for redirects, lands on the expected page): a failed login that re-renders
+the form, or a bounce to /auth/login, is an error, not a fast success.
+"""
+import argparse
+import collections
+import http.cookiejar
+import itertools
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks.common import BENCH_PASSWORD, make_bench_app, random_point, seed_posts, seed_users
+
+DEFAULT_MIX = {
+    'register': 2,
+    'login': 5,
+    'create_post': 10,
+    'nearby': 30,
+    'accept': 8,
+    'status': 40,
+    'admin_export': 5,
+}
+
+# Scenario -> (expected status, path the redirect must land on; a trailing '/' matches any page below it)
+EXPECTED = {
+    'register': (302, '/auth/login'),
+    'login': (302, ('/donor/dashboard', '/ngo/dashboard', '/admin/dashboard')),
+    'create_post': (302, '/donor/dashboard'),
+    'nearby': (200, None),
+    'accept': (302, '/ngo/'),  # losing the race also lands back on the NGO dashboard
+    'status': (200, None),
+    'admin_export': (200, None),
+}
+
+
+def is_expected(name: str, status: int, location: str) -> bool:
+    want_status, want_path = EXPECTED[name]
+    if status != want_status:
+        return False
+    if want_path is None:
+        return True
+    path = urllib.parse.urlsplit(location or '').path
+    return any(path == p or (p.endswith('/') and path.startswith(p))
+               for p in ((want_path,) if isinstance(want_path, str) else want_path))
+
+
+class TestClientDriver:
+    """Issues requests in-process through Flask's test client."""
+
+    def __init__(self, app, base_url=None):
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, data=None):
+        """Returns (status, redirect location or None)."""
+        resp = self._client.open(path, method=method, data=data)
+        return resp.status_code, resp.headers.get('Location')
+
+
+class HttpDriver:
+    """Issues real HTTP requests against a local WSGI server, keeping cookies."""
+
+    def __init__(self, app, base_url):
+        self._base = base_url
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method: str, path: str, data=None):
+        """Returns (status, redirect location or None)."""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self._base + path, data=body, method=method)
+        try:
+            with self._opener.open(req, timeout=30) as resp:
+                resp.read()
+                return resp.status, resp.headers.get('Location')
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('Location')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class LoadTest:
+    def __init__(self, app, driver_cls, base_url, mix, seed, donor_emails, ngo_emails, post_ids, posts_by_donor):
+        self.app = app
+        self.driver_cls = driver_cls
+        self.base_url = base_url
+        self.mix = mix
+        self.seed = seed
+        self.donor_emails = donor_emails
+        self.ngo_emails = ngo_emails
+        self.post_ids = post_ids
+        self.posts_by_donor = posts_by_donor
+        self.samples = {}  # endpoint -> [latency seconds]
+        self.errors = {}
+        self.error_statuses = {}  # endpoint -> Counter of unexpected statuses
+        self._lock = threading.Lock()
+        self._reg_ids = itertools.count()
+
+    def _record(self, name: str, elapsed: float, status: int, location: str = None):
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if not is_expected(name, status, location):
+                self.errors[name] = self.errors.get(name, 0) + 1
+                self.error_statuses.setdefault(name, collections.Counter())[status] += 1
+
+    def _timed(self, name, driver, method, path, data=None):
+        t0 = time.perf_counter()
+        try:
+            status, location = driver.request(method, path, data)
+        except Exception:
+            status, location = 599, None
+        self._record(name, time.perf_counter() - t0, status, location)
+
+    def _login(self, email):
+        driver = self.driver_cls(self.app, self.base_url)
+        status, location = driver.request('POST', '/auth/login', {'email': email, 'password': BENCH_PASSWORD})
+        if not is_expected('login', status, location):
+            raise RuntimeError(f'Worker login as {email} failed: {status} -> {location}')
+        return driver
+
+    def worker(self, worker_id: int, n_requests: int):
+        rng = random.Random(self.seed * 1000 + worker_id)
+        donor_email = rng.choice(self.donor_emails)
+        donor = self._login(donor_email)
+        own_posts = self.posts_by_donor.get(donor_email) or self.post_ids
+        ngo = self._login(rng.choice(self.ngo_emails))
+        admin = self._login('admin0@bench.local')
+        names = list(self.mix)
+        weights = [self.mix[n] for n in names]
+
+        for _ in range(n_requests):
+            name = rng.choices(names, weights)[0]
+            if name == 'register':
+                i = next(self._reg_ids)
+                lat, lon = random_point(rng)
+                self._timed(name, self.driver_cls(self.app, self.base_url), 'POST', '/auth/register', {
+                    'name': f'New {i}', 'email': f'new{worker_id}_{i}@bench.local', 'password': BENCH_PASSWORD,
+                    'role': rng.choice(['donor', 'ngo']), 'latitude': lat, 'longitude': lon,
+                })
+            elif name == 'login':
+                email = rng.choice(self.donor_emails + self.ngo_emails)
+                self._timed(name, self.driver_cls(self.app, self.base_url), 'POST', '/auth/login',
+                            {'email': email, 'password': BENCH_PASSWORD})
+            elif name == 'create_post':
+                lat, lon = random_point(rng)
+                self._timed(name, donor, 'POST', '/donor/post/create', {
+                    'food_type': rng.choice(['rice', 'dal', 'bread']), 'quantity': rng.randint(5, 100),
+                    'expiry_hours': 4, 'delivery_type': rng.choice(['pickup', 'delivery']),
+                    'latitude': lat, 'longitude': lon,
+                })
+            elif name == 'nearby':
+                self._timed(name, ngo, 'GET', '/ngo/dashboard')
+            elif name == 'accept':
+                # Concentrate on a few hot posts so workers race for the same rows
+                post_id = self.post_ids[rng.randrange(min(len(self.post_ids), 20))]
+                self._timed(name, ngo, 'POST', f'/ngo/post/{post_id}/accept')
+            elif name == 'status':
+                self._timed(name, donor, 'GET', f'/donor/api/post/{rng.choice(own_posts)}/status')
+            elif name == 'admin_export':
+                self._timed(name, admin, 'GET', '/admin/export/csv')
+
+    def run(self, concurrency: int, total_requests: int):
+        per_worker = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                      for i in range(concurrency)]
+        threads = [threading.Thread(target=self.worker, args=(i, n)) for i, n in enumerate(per_worker)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - t0
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def report(samples, errors, elapsed: float, error_statuses=None):
+    total = sum(len(v) for v in samples.values())
+    ok = total - sum(errors.values())
+    print(f'\n{total} requests in {elapsed:.2f} s -> {total / elapsed:,.1f} req/s, '
+          f'{ok} as expected -> {ok / elapsed:,.1f} req/s\n')
+    print(f'{"endpoint":<14}{"count":>8}{"errors":>8}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}')
+    for name in sorted(samples):
+        values = sorted(samples[name])
+        print(f'{name:<14}{len(values):>8}{errors.get(name, 0):>8}{len(values) / elapsed:>9.1f}'
+              f'{percentile(values, 50) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}'
+              f'{percentile(values, 99) * 1000:>9.1f}{values[-1] * 1000:>9.1f}')
+    for name, statuses in sorted((error_statuses or {}).items()):
+        want_status, want_path = EXPECTED[name]
+        seen = ', '.join(f'{status} x{n}' for status, n in statuses.most_common())
+        print(f'  {name}: expected {want_status}{" -> " + str(want_path) if want_path else ""}, got {seen}')
+
+
+def parse_mix(text: str):
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f'Unknown scenario {name!r}; choose from {", ".join(DEFAULT_MIX)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['client', 'wsgi'], default='client',
+                        help='Flask test client in-process, or HTTP against a local threaded WSGI server')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--mix', default='', help='Scenario weights, e.g. nearby=30,status=40,accept=8')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--donors', type=int, default=200)
+    parser.add_argument('--ngos', type=int, default=200)
+    parser.add_argument('--posts', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = make_bench_app()
+    with app.app_context():
+        from app.models import FoodPost, User
+        donor_emails = seed_users('donor', args.donors, rng)
+        ngo_emails = seed_users('ngo', args.ngos, rng)
+        seed_users('admin', 1, rng)
+        donor_ids = [u.id for u in User.query.filter_by(role='donor').with_entities(User.id)]
+        seed_posts(donor_ids, args.posts, rng)
+        post_ids = []
+        posts_by_donor = {}
+        rows = FoodPost.query.join(User, FoodPost.donor_id == User.id).with_entities(
+            FoodPost.id, User.email).order_by(FoodPost.id)
+        for post_id, email in rows:
+            post_ids.append(post_id)
+            posts_by_donor.setdefault(email, []).append(post_id)
+
+    server = None
+    base_url = None
+    driver_cls = TestClientDriver
+    if args.mode == 'wsgi':
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        driver_cls = HttpDriver
+
+    test = LoadTest(app, driver_cls, base_url, parse_mix(args.mix), args.seed,
+                    donor_emails, ngo_emails, post_ids, posts_by_donor)
+    print(f'mode={args.mode} concurrency={args.concurrency} requests={args.requests} seed={args.seed} '
+          f'donors={args.donors} ngos={args.ngos} posts={args.posts}')
+    elapsed = test.run(args.concurrency, args.requests)
+    if server is not None:
+        server.shutdown()
+    report(test.samples, test.errors, elapsed, test.error_statuses)
+
+
+if __name__ == '__main__':
+    main()
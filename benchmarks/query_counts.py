@@ -0,0 +1,122 @@
+"""
+Query-count harness: asserts every listing page issues a fixed, bounded number
+of SQL statements no matter how many rows it lists (no N+1 lazy loads).
+
+    python -m benchmarks.query_counts
+
+Exits non-zero if any page exceeds its budget or grows with the row count.
+"""
+import random
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from benchmarks.common import BENCH_PASSWORD, make_bench_app, login, random_point
+
+# Maximum statements per page render, including login lookup and expiry sweep
+PAGE_BUDGETS = {
+    '/admin/dashboard': 12,
+    '/admin/posts': 6,
+    '/admin/export/csv': 6,
+    '/donor/dashboard': 6,
+    '/ngo/dashboard': 8,
+    'post_detail': 5,
+}
+
+
+@contextmanager
+def count_statements(engines):
+    counter = {'n': 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['n'] += 1
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', on_execute)
+
+
+def seed(rows: int, rng: random.Random):
+    """One donor and one NGO who own every listed post, each post touching a distinct other user."""
+    from app import db
+    from app.models import FoodPost, User
+
+    def user(email, role):
+        lat, lon = random_point(rng)
+        u = User(name=email, email=email, role=role, latitude=lat, longitude=lon)
+        u.set_password(BENCH_PASSWORD)
+        db.session.add(u)
+        return u
+
+    donor, ngo, _ = user('donor@q.local', 'donor'), user('ngo@q.local', 'ngo'), user('admin@q.local', 'admin')
+    others_d = [user(f'd{i}@q.local', 'donor') for i in range(rows)]
+    others_n = [user(f'n{i}@q.local', 'ngo') for i in range(rows)]
+    db.session.commit()
+
+    now = datetime.utcnow()
+    for i in range(rows):
+        lat, lon = ngo.latitude, ngo.longitude
+        # donor's posts, each accepted by a different NGO
+        db.session.add(FoodPost(donor_id=donor.id, ngo_id=others_n[i].id, status='accepted', food_type='rice',
+                                quantity=10, expiry_time=now + timedelta(hours=5), latitude=lat, longitude=lon,
+                                accepted_at=now))
+        # NGO's accepted posts, each from a different donor
+        db.session.add(FoodPost(donor_id=others_d[i].id, ngo_id=ngo.id, status='accepted', food_type='dal',
+                                quantity=10, expiry_time=now + timedelta(hours=5), latitude=lat, longitude=lon,
+                                accepted_at=now))
+        # available nearby posts
+        db.session.add(FoodPost(donor_id=others_d[i].id, food_type='bread', quantity=5,
+                                expiry_time=now + timedelta(hours=5), latitude=lat, longitude=lon))
+    db.session.commit()
+    return FoodPost.query.filter_by(donor_id=donor.id).first().id
+
+
+def measure(rows: int):
+    from app import db
+
+    app = make_bench_app()
+    with app.app_context():
+        post_id = seed(rows, random.Random(rows))
+        engines = list(db.engines.values())
+
+    clients = {}
+    for role in ('admin', 'donor', 'ngo'):
+        clients[role] = app.test_client()
+        login(clients[role], f'{role}@q.local')
+
+    pages = {
+        '/admin/dashboard': ('admin', '/admin/dashboard'),
+        '/admin/posts': ('admin', '/admin/posts'),
+        '/admin/export/csv': ('admin', f'/admin/export/csv?year={datetime.utcnow().year}&month={datetime.utcnow().month}'),
+        '/donor/dashboard': ('donor', '/donor/dashboard'),
+        '/ngo/dashboard': ('ngo', '/ngo/dashboard'),
+        'post_detail': ('donor', f'/donor/post/{post_id}'),
+    }
+    counts = {}
+    for name, (role, url) in pages.items():
+        with count_statements(engines) as counter:
+            resp = clients[role].get(url)
+        assert resp.status_code == 200, (url, resp.status_code)
+        counts[name] = counter['n']
+    return counts
+
+
+def main():
+    small, large = measure(3), measure(150)
+    failed = False
+    print(f'{"page":<20}{"3 rows":>8}{"150 rows":>10}{"budget":>8}')
+    for name, budget in PAGE_BUDGETS.items():
+        ok = small[name] == large[name] and large[name] <= budget
+        failed |= not ok
+        print(f'{name:<20}{small[name]:>8}{large[name]:>10}{budget:>8}  {"ok" if ok else "FAIL"}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
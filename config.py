@@ -10,8 +10,65 @@ class Config:
         'sqlite:///' + os.path.join(BASE_DIR, 'surplus_link.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Location matching radius
+    # Location matching radius, and the largest radius an NGO may choose for matching and alerts
     MATCH_RADIUS_KM = 25
+    MAX_MATCH_RADIUS_KM = 100
+
+    # Bayesian trust score: ratings are smoothed toward PRIOR_MEAN as if each
+    # user started with PRIOR_WEIGHT ratings of that value
+    TRUST_PRIOR_MEAN = 3.5
+    TRUST_PRIOR_WEIGHT = 5
+
+    # Grid cell size (degrees) of the in-memory NGO spatial index
+    SPATIAL_CELL_DEG = 0.25
+
+    # Email NGOs whose radius covers a newly created post, this many per SMTP connection,
+    # on a worker of their own so acceptance/delivery mail never queues behind them
+    NEARBY_ALERTS_ENABLED = True
+    NEARBY_ALERT_BATCH_SIZE = 100
+
+    # Region sharding: posts inside a box go to their own SQLite file.
+    # List of (name, (min_lat, min_lon, max_lat, max_lon)); append only, order fixes post id ranges.
+    # Posts outside every region stay in the main database.
+    REGION_SHARDS = []
+    REGION_SHARD_DIR = BASE_DIR
+
+    # Map clustering: cells per tile side, cached tiles (LRU), and max seconds a tile may be stale
+    # in another worker process (the local process invalidates immediately on post changes)
+    CLUSTER_GRID_SIZE = 8
+    CLUSTER_CACHE_TILES = 4096
+    CLUSTER_CACHE_TTL = 30
+
+    # Rendered per-post dashboard fragments kept in memory (LRU entries per process)
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_SIZE = 20000
+
+    # Pickup route planner: average travel speed, time spent at each stop, and cached distance matrices (LRU)
+    ROUTE_AVG_SPEED_KMH = 25
+    ROUTE_STOP_MINUTES = 5
+    ROUTE_MATRIX_CACHE_SIZE = 256
+
+    # Live delivery tracking: points kept in memory per delivery, and points persisted on completion;
+    # at most TRACKING_MAX_DELIVERIES live trails, and trails idle this long are dropped when space is needed
+    TRACKING_BUFFER_SIZE = 512
+    TRACKING_PERSIST_POINTS = 100
+    TRACKING_MAX_DELIVERIES = 2000
+    TRACKING_IDLE_SECONDS = 3600
+
+    # Bulk user import: rows per insert transaction, password-hashing processes (None = CPU count),
+    # and where admin uploads, status and reports are kept while a background import runs (None = instance/imports)
+    IMPORT_CHUNK_SIZE = 500
+    IMPORT_HASH_WORKERS = None
+    IMPORT_JOB_DIR = os.environ.get('IMPORT_JOB_DIR')
+
+    # Change-feed export: max rows per table per call, and how long recent writes are held back
+    # (must exceed the longest write transaction, or an in-flight row could be skipped)
+    CHANGE_FEED_PAGE_SIZE = 10000
+    CHANGE_FEED_LAG_SECONDS = 5
+
+    # Ranked post search: bm25 relevance is computed over the newest this-many matches per shard
+    # (None = all matches, slower for very common words on large tables)
+    SEARCH_RANK_WINDOW = 5000
 
     # SMTP (local) - for local testing, use Python's debugging server or local SMTP
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'localhost'
@@ -0,0 +1,7 @@
+"""Export rows changed since the last sync as gzip JSON Lines. Same as `python manage.py export-changes`."""
+import sys
+
+from manage import main
+
+if __name__ == '__main__':
+    main(['export-changes'] + sys.argv[1:])
@@ -0,0 +1,39 @@
+"""Gunicorn settings for production. Override with SURPLUS_* environment variables."""
+import os
+
+bind = os.environ.get('SURPLUS_BIND', '0.0.0.0:8000')
+# One process, many threads. The NGO spatial index, live delivery trails and the
+# tile/fragment caches live in process memory and are updated by the process that
+# handles the write; with several workers the others would match new posts against a
+# stale index and each would hold only part of a delivery's trail. Requests are mostly
+# SQLite I/O, which releases the GIL, so threads carry the concurrency.
+workers = int(os.environ.get('SURPLUS_WORKERS') or 1)
+threads = int(os.environ.get('SURPLUS_THREADS', 8))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('SURPLUS_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.environ.get('SURPLUS_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+# Import and warm the app once in the master, then fork workers that share it
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    if server.cfg.workers > 1:
+        server.log.warning('SURPLUS_WORKERS > 1: the NGO alert index and live delivery trails are per process '
+                           'and will diverge between workers; see gunicorn.conf.py')
+
+
+def post_fork(server, worker):
+    # Connections opened during warmup must not be shared across processes: that
+    # includes each region shard's engine, whose pool the master filled at startup
+    from app import db
+    from wsgi import app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
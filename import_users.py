@@ -0,0 +1,7 @@
+"""Bulk import users from a CSV or JSON Lines file. Same as `python manage.py import-users`."""
+import sys
+
+from manage import main
+
+if __name__ == '__main__':
+    main(['import-users'] + sys.argv[1:])
@@ -0,0 +1,316 @@
+"""
+Maintenance jobs for cron, without booting the web stack.
+
+    python manage.py migrate
+    python manage.py expire
+    python manage.py recompute-ratings --batch-size 2000
+    python manage.py archive --days 90 --out archive.jsonl.gz
+    python manage.py rollup --since 2026-01-01 --out daily.csv
+    python manage.py seed --donors 50 --ngos 20 --posts 5000
+    python manage.py import-users partners.csv --role ngo --report report.csv
+    python manage.py export-changes --state sync.cursor --out changes.jsonl.gz
+    python manage.py create-admin admin@example.org Admin s3cret
+
+The app is built with create_app(web=False): config, database and models
+only, no blueprints or Flask-Login. Each job imports just the services it
+uses. Start-up time, per-batch progress and totals go to stderr; work is
+committed after every batch, so an interrupted job keeps what it finished.
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse  # noqa: E402
+import sys  # noqa: E402
+
+
+def _log(message: str):
+    print(f'[{time.perf_counter() - _STARTED:7.2f} s] {message}', file=sys.stderr)
+
+
+def _run_batches(label: str, batches):
+    """Commit after each batch from a service generator and report progress. Returns the total."""
+    from app.unit_of_work import commit
+    done = 0
+    for n in batches:
+        commit()
+        done += n
+        _log(f'{label}: {done}')
+    return done
+
+
+def migrate(args):
+    from app.migrations import pending_changes, upgrade_schema
+    from app.unit_of_work import commit
+
+    if args.check:
+        changes = pending_changes()
+        for change in changes:
+            _log(f'pending: {change}')
+        _log(f'{len(changes)} pending schema changes')
+        raise SystemExit(1 if changes else 0)
+    applied = upgrade_schema()
+    commit()
+    for change in applied:
+        _log(change)
+    _log(f'Applied {len(applied)} schema changes' if applied else 'Schema is up to date')
+
+
+def expire(args):
+    from app.services.location_service import iter_expire_posts
+    total = _run_batches('expired', iter_expire_posts(args.batch_size))
+    _log(f'Expired {total} posts')
+
+
+def recompute_ratings(args):
+    from app.services.rating_service import iter_recompute_trust_scores
+    total = _run_batches('users', iter_recompute_trust_scores(args.batch_size))
+    _log(f'Recomputed trust scores for {total} users')
+
+
+def archive(args):
+    from app.services.archive_service import iter_archive_expired_posts
+    from app.services.export_service import gzip_jsonl
+    from app.unit_of_work import commit
+
+    total = 0
+    # Appending keeps earlier runs; concatenated gzip members are a valid gzip file
+    with open(args.out, 'ab') as out:
+        for records in iter_archive_expired_posts(args.days, args.batch_size):
+            for chunk in gzip_jsonl(records):
+                out.write(chunk)
+            out.flush()
+            commit()  # rows are deleted only once their batch is on disk
+            total += len(records)
+            _log(f'archived: {total}')
+    _log(f'Archived {total} posts to {args.out}')
+
+
+def rollup(args):
+    import csv
+    from datetime import date, datetime
+    from app.services.rollup_service import ROLLUP_FIELDS, iter_daily_rollups
+
+    since = datetime.strptime(args.since, '%Y-%m-%d').date()
+    until = datetime.strptime(args.until, '%Y-%m-%d').date() if args.until else date.today()
+    out = open(args.out, 'w', newline='', encoding='utf-8') if args.out else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=ROLLUP_FIELDS)
+        writer.writeheader()
+        days = 0
+        for rows in iter_daily_rollups(since, until):
+            writer.writerows(rows)
+            days += len(rows)
+            _log(f'days: {days} (through {rows[-1]["day"]})')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def seed(args):
+    import random
+    from datetime import datetime, timedelta
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import FoodPost, User
+    from app.sharding import get_router, use_regions
+    from app.unit_of_work import commit
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+
+    def point():
+        return (args.lat + rng.uniform(-args.spread, args.spread),
+                args.lon + rng.uniform(-args.spread, args.spread))
+
+    # One shared hash: seeded accounts are for demos and load tests, not real users
+    pw_hash = generate_password_hash(args.password)
+    for role, count in (('donor', args.donors), ('ngo', args.ngos)):
+        for start in range(0, count, args.batch_size):
+            rows = []
+            for i in range(start, min(start + args.batch_size, count)):
+                lat, lon = point()
+                rows.append({'name': f'Seed {role} {i}', 'email': f'{role}{i}@seed.local', 'password_hash': pw_hash,
+                             'role': role, 'latitude': lat, 'longitude': lon, 'average_rating': 0.0,
+                             'created_at': now, 'updated_at': now})
+            db.session.execute(User.__table__.insert().prefix_with('OR IGNORE'), rows)
+            commit()
+            _log(f'{role}s: {start + len(rows)}/{count}')
+
+    donor_ids = [u.id for u in User.query.with_entities(User.id).filter(User.email.like('donor%@seed.local'))]
+    if args.posts and not donor_ids:
+        raise SystemExit('No seeded donors to own the posts; run with --donors first.')
+    router = get_router()
+    for start in range(0, args.posts, args.batch_size):
+        by_region = {}
+        for _ in range(start, min(start + args.batch_size, args.posts)):
+            lat, lon = point()
+            quantity = rng.randint(5, 200)
+            by_region.setdefault(router.region_for(lat, lon), []).append({
+                'donor_id': rng.choice(donor_ids), 'food_type': rng.choice(['rice', 'dal', 'bread', 'curry', 'biryani']),
+                'quantity': quantity, 'remaining_quantity': quantity,
+                'expiry_time': now + timedelta(hours=rng.randint(2, 12)), 'status': 'available',
+                'delivery_type': rng.choice(['pickup', 'delivery']), 'latitude': lat, 'longitude': lon,
+                'created_at': now, 'updated_at': now,
+            })
+        for region, rows in by_region.items():
+            with use_regions([region]):
+                db.session.execute(FoodPost.__table__.insert(), rows)
+        commit()
+        _log(f'posts: {min(start + args.batch_size, args.posts)}/{args.posts}')
+    if args.ngos:
+        from app.services.location_service import reset_ngo_index
+        reset_ngo_index()
+    _log(f'Seeded; every seeded account uses the password {args.password!r}')
+
+
+def import_users(args):
+    from app.services.import_service import (
+        IMPORT_ROLES, detect_format, import_users as run_import, read_rows, report_lines
+    )
+
+    if args.role not in IMPORT_ROLES:
+        raise SystemExit(f'--role must be one of {", ".join(IMPORT_ROLES)}')
+    counts = {}
+    out = open(args.report, 'w', newline='', encoding='utf-8') if args.report else sys.stdout
+    try:
+        with open(args.path, newline='', encoding='utf-8-sig') as f:
+            records = read_rows(f, args.format or detect_format(args.path))
+            results = run_import(records, default_role=args.role, chunk_size=args.chunk_size, workers=args.workers)
+            for n, line in enumerate(report_lines(results, counts)):
+                out.write(line)
+                if n and n % 1000 == 0:
+                    out.flush()
+                    _log(f'rows: {n}')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    summary = ', '.join(f'{status}={count}' for status, count in sorted(counts.items())) or 'no rows'
+    _log(f'Imported: {summary}')
+
+
+def export_changes(args):
+    import os
+    from app.services.export_service import InvalidCursor, collect_changes, gzip_jsonl
+
+    cursor = args.since
+    if not cursor and args.state and os.path.exists(args.state):
+        with open(args.state) as f:
+            cursor = f.read().strip()
+    total = 0
+    with open(args.out, 'wb') as out:
+        while True:
+            try:
+                records, cursor, has_more = collect_changes(cursor, args.limit)
+            except InvalidCursor as e:
+                raise SystemExit(f'Invalid cursor: {e}')
+            # Concatenated gzip members are a valid gzip file
+            for chunk in gzip_jsonl(records):
+                out.write(chunk)
+            total += len(records)
+            _log(f'changes: {total}')
+            if not has_more:
+                break
+    if args.state:
+        with open(args.state, 'w') as f:
+            f.write(cursor)
+    _log(f'{total} changed rows -> {args.out}')
+    print(cursor)
+
+
+def create_admin(args):
+    from app import db
+    from app.models import User
+    from app.unit_of_work import commit
+
+    if User.query.filter_by(email=args.email).first():
+        print(f'User {args.email} already exists.')
+        return
+    u = User(name=args.name, email=args.email, role='admin')
+    u.set_password(args.password)
+    db.session.add(u)
+    commit()
+    print(f'Admin created: {args.email} / {args.password}')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    jobs = parser.add_subparsers(dest='job', required=True, metavar='job')
+
+    p = jobs.add_parser('migrate', help='Add columns, indexes and table options missing from an older database')
+    p.add_argument('--check', action='store_true', help='List pending changes and exit 1 if there are any')
+    p.set_defaults(func=migrate)
+
+    p = jobs.add_parser('expire', help='Mark available posts past their expiry time as expired')
+    p.add_argument('--batch-size', type=int, default=1000)
+    p.set_defaults(func=expire)
+
+    p = jobs.add_parser('recompute-ratings', help='Rebuild rating counters and trust scores from the rating table')
+    p.add_argument('--batch-size', type=int, default=1000)
+    p.set_defaults(func=recompute_ratings)
+
+    p = jobs.add_parser('archive', help='Move long-expired, never-claimed posts to a gzip JSONL file')
+    p.add_argument('--days', type=int, default=90, help='Archive posts that expired more than this many days ago')
+    p.add_argument('--out', required=True, help='Archive file (.jsonl.gz), appended to')
+    p.add_argument('--batch-size', type=int, default=1000)
+    p.set_defaults(func=archive)
+
+    p = jobs.add_parser('rollup', help='Backfill daily post/delivery/expiry rollups as CSV')
+    p.add_argument('--since', required=True, help='First day, YYYY-MM-DD')
+    p.add_argument('--until', help='Last day, YYYY-MM-DD (default: today)')
+    p.add_argument('--out', help='CSV file (default: stdout)')
+    p.set_defaults(func=rollup)
+
+    p = jobs.add_parser('seed', help='Insert demo donors, NGOs and available posts')
+    p.add_argument('--donors', type=int, default=20)
+    p.add_argument('--ngos', type=int, default=10)
+    p.add_argument('--posts', type=int, default=500)
+    p.add_argument('--lat', type=float, default=12.97)
+    p.add_argument('--lon', type=float, default=77.59)
+    p.add_argument('--spread', type=float, default=0.35, help='Degrees around --lat/--lon')
+    p.add_argument('--password', default='seed-pass')
+    p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--batch-size', type=int, default=1000)
+    p.set_defaults(func=seed)
+
+    p = jobs.add_parser('import-users', help='Bulk-create donors and NGOs from a CSV or JSON Lines file')
+    p.add_argument('path', help='CSV (with header) or .jsonl file')
+    p.add_argument('--role', default='donor', help='Role for rows without one: donor or ngo')
+    p.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+    p.add_argument('--chunk-size', type=int, help='Rows per insert transaction')
+    p.add_argument('--workers', type=int, help='Password hashing processes')
+    p.add_argument('--report', help='Write the per-row report here instead of stdout')
+    p.set_defaults(func=import_users)
+
+    p = jobs.add_parser('export-changes', help='Export rows changed since a cursor as gzip JSON Lines')
+    p.add_argument('--since', default='', help='Cursor from a previous export (default: everything)')
+    p.add_argument('--state', help='File holding the cursor between runs')
+    p.add_argument('--out', required=True, help='Output .jsonl.gz file')
+    p.add_argument('--limit', type=int, help='Rows per table per page')
+    p.set_defaults(func=export_changes)
+
+    p = jobs.add_parser('create-admin', help='Create one admin user')
+    p.add_argument('email', nargs='?', default='admin@surpluslink.local')
+    p.add_argument('name', nargs='?', default='Admin')
+    p.add_argument('password', nargs='?', default='admin123')
+    p.set_defaults(func=create_admin)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from app import create_app
+    app = create_app(web=False)
+    _log(f'Started {args.job} (app ready in {(time.perf_counter() - _STARTED) * 1000:.0f} ms)')
+    with app.app_context():
+        if args.func is not migrate:
+            from app.migrations import pending_changes
+            if pending_changes():
+                raise SystemExit('Database schema is out of date; run `python manage.py migrate` first.')
+        args.func(args)
+    _log('Done')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,10 @@
-"""Application entry point."""
+"""Development entry point. For production use wsgi.py with gunicorn."""
 #run
 from app import create_app
+from app.warmup import warm_up
 
 app = create_app()
 
 if __name__ == '__main__':
+    warm_up(app)
     app.run(debug=True, host='0.0.0.0', port=5000)